@@ -13,7 +13,20 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
-from . import ast, debug, parser
+__version__ = '0.1.0'
+
+from . import (
+    ast,
+    canonical,
+    codegen,
+    debug,
+    parser,
+    prover,
+    refute,
+    search,
+    stats,
+    store,
+)
 from .ast import (
     AlgebraError,
     Expression,
@@ -26,5 +39,6 @@ from .ast import (
     SMFN,
 )
 from .parser import ParseError, parse
+from .prover import Result, prove, prove_many
 
 debug.set_level(debug.DebugLevel.NONE)
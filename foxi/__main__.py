@@ -13,74 +13,325 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import collections
+import concurrent.futures
+import contextlib
+import functools
+import io
+import json
 import sys
 import types
 import typing as t
 
+from dataclasses import asdict
+
 import foxi
-from foxi import debug
+from foxi import debug, prover, refute, search, server, stats, store, worker
 
 
-def _prove(expr: str) -> t.Optional[bool]:
-    try:
-        parsed = foxi.parse(expr)
-    except (foxi.AlgebraError, foxi.ParseError) as e:
-        debug.error('{}', e)
-        return None
+def _test_expr(expr: str) -> t.Tuple[bool, str, foxi.Result]:
+    expect, _, expr = expr.partition(' ')
+    assert expect in ('TRUE', 'FALSE', 'ERROR')
+
+    return _check_result(expect, expr, foxi.prove(expr))
 
-    if isinstance(parsed, foxi.Algebraic):
-        debug.info('{}', parsed)
-        return None
 
-    eval = parsed.eval()
+def _check_result(
+    expect: str, expr: str, result: foxi.Result
+) -> t.Tuple[bool, str, foxi.Result]:
+    # Expressions that are not equations were reported as errors before.
+    verdict = 'ERROR' if result.verdict == 'EXPRESSION' else result.verdict
 
-    if eval.is_zero:
-        debug.info('Proven to be TRUE: {}', expr)
-        return True
+    if verdict != expect:
+        debug.test('ERROR Expression "{}" expected to be {}', expr, expect)
+        return False, expect, result
     else:
-        debug.info('Proven to be FALSE: {}', expr)
-        debug.info('Resulting expression: {} = 0', eval)
-        return False
+        return True, expect, result
+
+
+def _capture(func: t.Callable[[str], t.Any], expr: str) -> t.Tuple[t.Any, str]:
+    """Call ``func`` on ``expr``, returning its result together with everything
+    it printed, so the output of pool workers can be replayed in input order.
+    """
+
+    with contextlib.redirect_stdout(io.StringIO()) as out:
+        result = func(expr)
+
+    return result, out.getvalue()
+
+
+def _init_worker(
+    level: debug.DebugLevel,
+    stats_enabled: bool,
+    split_jobs: int,
+    backend: str,
+    representation: str,
+    refute_points: int,
+    proof_cache: t.Optional[store.ProofCache],
+) -> None:
+    debug.set_level(level)
+    stats.set_enabled(stats_enabled)
+    search.set_jobs(split_jobs)
+    foxi.ast.set_backend(backend)
+    foxi.ast.set_representation(representation)
+    refute.set_points(refute_points)
+    prover.set_proof_cache(proof_cache)
+
+
+def _worker_initargs() -> t.Tuple[t.Any, ...]:
+    return (
+        debug.get_level(),
+        stats.enabled,
+        search.get_jobs(),
+        foxi.ast.get_backend(),
+        foxi.ast.get_representation(),
+        refute.get_points(),
+        prover.get_proof_cache(),
+    )
 
 
-def _test_expr(expr: str) -> bool:
-    expect_map = {'TRUE': True, 'FALSE': False, 'ERROR': None}
+def _map_exprs(
+    func: t.Callable[[str], t.Any],
+    exprs: t.Iterable[str],
+    jobs: int,
+    timeout: t.Optional[float] = None,
+) -> t.Iterator[t.Tuple[str, t.Any, str]]:
+    """Apply ``func`` to each expression, in a pool of ``jobs`` processes if
+    ``jobs`` is larger than one. Yields the expressions with their results in
+    input order, together with the output that still has to be printed for
+    them.
+
+    If ``timeout`` is given, each call runs in a worker process that is
+    killed after ``timeout`` seconds, and the result of a killed call is
+    ``None``. The result of a call that raised in a worker process, or whose
+    worker died, is a ``worker.WorkerError``.
+
+    ``exprs`` is consumed lazily: at most a few expressions per job are in
+    flight at any time.
+    """
+
+    capture = functools.partial(_capture, func)
+
+    if timeout is not None:
+        for expr, captured in worker.map_with_timeout(
+            capture,
+            exprs,
+            max(1, jobs),
+            timeout,
+            initializer=_init_worker,
+            initargs=_worker_initargs(),
+        ):
+            if isinstance(captured, worker.WorkerError):
+                yield expr, captured, ''
+            else:
+                yield (expr, *(captured or (None, '')))
+        return
+
+    if jobs <= 1:
+        for expr in exprs:
+            yield expr, func(expr), ''
+        return
 
-    expect, _, expr = expr.partition(' ')
-    assert expect in expect_map
+    window: t.Deque[t.Tuple[str, concurrent.futures.Future]]
+    window = collections.deque()
 
-    result = _prove(expr)
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=jobs, initializer=_init_worker, initargs=_worker_initargs()
+    ) as executor:
+        for expr in exprs:
+            window.append((expr, executor.submit(capture, expr)))
 
-    if result != expect_map[expect]:
-        debug.test('ERROR Expression "{}" expected to be {}', expr, expect)
-        return False
+            if len(window) >= jobs * 4:
+                expr, future = window.popleft()
+                yield (expr, *future.result())
+
+        while window:
+            expr, future = window.popleft()
+            yield (expr, *future.result())
+
+
+def _map_remote(
+    client: server.Client,
+    exprs: t.Iterable[str],
+    test: bool,
+    output: bool,
+    timeout: t.Optional[float] = None,
+) -> t.Iterator[t.Tuple[str, t.Any, str]]:
+    """Like ``_map_exprs`` with ``foxi.prove``, or ``_test_expr`` if
+    ``test`` is set, but prove the expressions on the server of ``client``.
+    The server only prints the output of the proofs if ``output`` is set.
+    """
+
+    expects: t.Deque[str] = collections.deque()
+
+    def send() -> t.Iterator[str]:
+        for expr in exprs:
+            if test:
+                expect, _, expr = expr.partition(' ')
+                assert expect in ('TRUE', 'FALSE', 'ERROR')
+                expects.append(expect)
+
+            yield expr
+
+    for res, out in client.prove_many(send(), timeout, output):
+        expr = res.expression
+
+        if test:
+            expect = expects.popleft()
+            expr = f'{expect} {expr}'
+
+        if test and res.verdict == 'TIMEOUT':
+            # The server's own timeout applies without one of the client.
+            yield expr, (False, expect, res), ''
+        elif test:
+            tested, out = _capture(
+                functools.partial(_check_result, expect, result=res),
+                res.expression,
+            )
+            yield expr, tested, out
+        else:
+            yield expr, res, out
+
+
+def _read_exprs(files: t.Sequence[str]) -> t.Iterator[str]:
+    """Lazily read the expressions from ``files``, where ``-`` is stdin.
+    """
+
+    for f in files:
+        if f == '-':
+            lines: t.ContextManager[t.IO[str]]
+            lines = contextlib.nullcontext(sys.stdin)
+        else:
+            lines = open(f)
+
+        with lines as fp:
+            for l in fp:
+                l = l.strip()
+                if l and l[0] != '#':
+                    yield l
+
+
+def _write_record(**record: t.Any) -> None:
+    print(json.dumps(record), flush=True)
+
+
+def _print_stats(title: str, collected: stats.Stats) -> None:
+    print(f'{title}:')
+    print(collected.summary())
+
+
+def _add_stats(run: stats.Stats, res: foxi.Result, format: str) -> None:
+    """Add the stats of ``res`` to the stats of the whole run, and print them
+    if the output is text.
+    """
+
+    if res.stats is None:
+        return
+
+    run.merge(res.stats)
+
+    if format == 'text':
+        collected = stats.Stats()
+        collected.merge(res.stats)
+        _print_stats('Stats', collected)
+
+
+def _write_total_stats(run: stats.Stats, format: str) -> None:
+    if not stats.enabled:
+        return
+
+    if format == 'jsonl':
+        _write_record(stats=run.as_dict())
     else:
-        return True
+        _print_stats('Total stats', run)
+
+
+def _timed_out(expr: str, timeout: float) -> foxi.Result:
+    debug.info('Timed out after {} seconds: {}', timeout, expr)
+    return foxi.Result(expr, 'TIMEOUT', elapsed=timeout)
+
 
+def _loop_files(
+    files: t.Sequence[str],
+    test: bool = False,
+    jobs: int = 1,
+    format: str = 'text',
+    timeout: t.Optional[float] = None,
+    client: t.Optional[server.Client] = None,
+) -> int:
+    exprs = _read_exprs(files)
+    run = stats.Stats()
 
-def _loop_files(files: t.Sequence[str], test: bool = False) -> int:
-    exprs = [
-        l
-        for f in files
-        for l in map(lambda l: l.strip(), open(f).readlines())
-        if l and l[0] != '#'
-    ]
+    def results(func: t.Callable[[str], t.Any]) -> t.Iterator[t.Any]:
+        if client is not None:
+            output = format == 'text' and not test
+            return _map_remote(client, exprs, test, output, timeout)
+
+        return _map_exprs(func, exprs, jobs, timeout)
 
     if test:
-        total = len(exprs)
+        # Count the expressions in a separate pass, so they can still be
+        # streamed. The number of expressions on stdin is not known upfront.
+        total: t.Union[int, str] = '?'
+        if '-' not in files:
+            total = sum(1 for _ in _read_exprs(files))
+
+        count = 0
         success = 0
+        timeouts = 0
+
+        for i, (expr, tested, out) in enumerate(results(_test_expr), 1):
+            count += 1
+
+            if tested is None:
+                assert timeout is not None
+                expect, _, text = expr.partition(' ')
+                tested = False, expect, _timed_out(text, timeout)
+            elif isinstance(tested, worker.WorkerError):
+                expect, _, text = expr.partition(' ')
+                tested = _check_result(
+                    expect, text, foxi.Result(text, 'ERROR', error=str(tested))
+                )
+
+            result, expect, res = tested
+
+            if res.verdict == 'TIMEOUT':
+                timeouts += 1
+                status = 'time'
+            else:
+                success += int(result)
+                status = 'succ' if result else 'fail'
+
+            if format == 'jsonl':
+                _write_record(**asdict(res), expected=expect, success=result)
+            else:
+                print(out, end='')
+                debug.test('{}/{}\t{}  {}', i, total, status, expr)
+
+            _add_stats(run, res, format)
+
+        debug.test('{} / {} tests succeeded!'.format(success, count))
+        if timeouts:
+            debug.test('{} / {} tests timed out'.format(timeouts, count))
+        _write_total_stats(run, format)
+
+        return count - success
+    else:
+        for expr, res, out in results(foxi.prove):
+            if res is None:
+                assert timeout is not None
+                res = _timed_out(expr, timeout)
+            elif isinstance(res, worker.WorkerError):
+                res = foxi.Result(expr, 'ERROR', error=str(res))
 
-        for i, expr in enumerate(exprs, 1):
-            result = int(_test_expr(expr))
-            success += result
-            debug.test('{}/{}\t{}  {}', i, total, 'succ' if result else 'fail', expr)
+            if format == 'jsonl':
+                _write_record(**asdict(res))
+            else:
+                print(out, end='')
 
-        debug.test('{} / {} tests succeeded!'.format(success, total))
+            _add_stats(run, res, format)
 
-        return total - success
-    else:
-        for expr in exprs:
-            _prove(expr)
+        _write_total_stats(run, format)
 
         return 0
 
@@ -95,7 +346,7 @@ def _loop_input() -> None:
             break
 
         if expr:
-            _prove(expr)
+            _add_stats(stats.Stats(), foxi.prove(expr), 'text')
 
         print()
 
@@ -138,6 +389,135 @@ def main() -> None:
             ' expression'
         ),
     )
+    argparser.add_argument(
+        '-j',
+        '--jobs',
+        type=int,
+        default=1,
+        help=(
+            'number of processes to prove the expressions from the input files'
+            ' with (default: 1)'
+        ),
+    )
+    argparser.add_argument(
+        '-J',
+        '--split-jobs',
+        type=int,
+        default=1,
+        help=(
+            'number of processes to check the zero/nonzero assignments of a'
+            ' single equation with (default: 1)'
+        ),
+    )
+    argparser.add_argument(
+        '-b',
+        '--backend',
+        choices=foxi.ast.BACKENDS,
+        default='sympy',
+        help='representation of polynomials (default: sympy)',
+    )
+    argparser.add_argument(
+        '-r',
+        '--representation',
+        choices=foxi.ast.REPRESENTATIONS,
+        default='tree',
+        help=(
+            'representation of nested conditionals: trees, or ordered and'
+            ' reduced decision diagrams (default: tree)'
+        ),
+    )
+    argparser.add_argument(
+        '-R',
+        '--refute',
+        type=int,
+        metavar='POINTS',
+        default=0,
+        help=(
+            'evaluate each equation at POINTS random points before proving'
+            ' it, and report a point at which the sides differ as its'
+            ' counterexample (default: 0)'
+        ),
+    )
+    argparser.add_argument(
+        '-f',
+        '--format',
+        choices=('text', 'jsonl'),
+        default='text',
+        help=(
+            'output format for expressions from the input files. jsonl writes'
+            ' one JSON record per expression with its verdict, residual'
+            ' expression, counterexample and elapsed time (default: text)'
+        ),
+    )
+    argparser.add_argument(
+        '-T',
+        '--timeout',
+        type=float,
+        metavar='SECONDS',
+        default=None,
+        help=(
+            'run each expression in a worker process that is killed after'
+            ' SECONDS seconds, and report it as TIMEOUT'
+        ),
+    )
+    argparser.add_argument(
+        '-s',
+        '--stats',
+        action='store_true',
+        default=False,
+        help=(
+            'count and time the operations of each expression, and print'
+            ' them for each expression and for the whole run'
+        ),
+    )
+    argparser.add_argument(
+        '-c',
+        '--cache-dir',
+        type=str,
+        default=None,
+        help=(
+            'directory of the persistent proof cache. equations that were'
+            ' proven before by the same version of foxi are not proven again'
+        ),
+    )
+    argparser.add_argument(
+        '--cache-clear',
+        action='store_true',
+        default=False,
+        help='remove all entries from the proof cache before proving',
+    )
+    argparser.add_argument(
+        '--cache-prune',
+        type=float,
+        metavar='DAYS',
+        default=None,
+        help=(
+            'remove the entries of other foxi versions and the entries that'
+            ' were not used in the last DAYS days from the proof cache'
+        ),
+    )
+    argparser.add_argument(
+        '--serve',
+        type=str,
+        metavar='ADDRESS',
+        default=None,
+        help=(
+            'instead of proving expressions, answer proof requests from'
+            ' --connect on ADDRESS, which is the path of a Unix socket or'
+            ' HOST:PORT. the requests are proven concurrently by --jobs'
+            ' processes, which keep their caches between requests'
+        ),
+    )
+    argparser.add_argument(
+        '--connect',
+        type=str,
+        metavar='ADDRESS',
+        default=None,
+        help=(
+            'prove the expressions from the input files with the server on'
+            ' ADDRESS. the options of the server apply, except for --timeout'
+        ),
+    )
     argparser.add_argument(
         'files',
         metavar='FILE',
@@ -145,19 +525,57 @@ def main() -> None:
         nargs='*',
         help=(
             'file to read expressions from, one per line. empty lines and '
-            'lines starting with a # are ignored'
+            'lines starting with a # are ignored. - reads from stdin, which '
+            'is the default in jsonl format if stdin is not a terminal'
         ),
     )
 
     args = argparser.parse_args()
 
-    if args.debug:
+    if args.format == 'jsonl':
+        debug.set_level(debug.DebugLevel.NONE)
+    elif args.debug:
         debug.set_level(debug.DebugLevel.DEBUG)
     elif args.test:
         debug.set_level(debug.DebugLevel.TEST)
     else:
         debug.set_level(debug.DebugLevel.INFO)
 
+    stats.set_enabled(args.stats)
+    search.set_jobs(args.split_jobs)
+    foxi.ast.set_backend(args.backend)
+    foxi.ast.set_representation(args.representation)
+    refute.set_points(args.refute)
+
+    if args.cache_dir is not None:
+        proof_cache = store.ProofCache.in_dir(args.cache_dir)
+
+        if args.cache_clear:
+            proof_cache.clear()
+
+        if args.cache_prune is not None:
+            proof_cache.prune(args.cache_prune * 24 * 60 * 60)
+
+        prover.set_proof_cache(proof_cache)
+
+        if (args.cache_clear or args.cache_prune is not None) and not (
+            args.files
+            or args.serve is not None
+            or args.format == 'jsonl'
+            and not sys.stdin.isatty()
+        ):
+            sys.exit(0)
+
+    if args.serve is not None:
+        server.serve(
+            server.parse_address(args.serve),
+            max(1, args.jobs),
+            args.timeout,
+            initializer=_init_worker,
+            initargs=_worker_initargs(),
+        )
+        sys.exit(0)
+
     if readline is not None:
         readline.read_init_file()
         try:
@@ -165,8 +583,32 @@ def main() -> None:
         except FileNotFoundError:
             pass
 
-    if args.files:
-        ret = _loop_files(args.files, args.test)
+    if not args.files and args.format == 'jsonl' and not sys.stdin.isatty():
+        args.files = ['-']
+
+    client = None
+    if args.connect is not None:
+        if not args.files:
+            argparser.error('--connect needs input files, use - for stdin')
+
+        try:
+            client = server.Client(server.parse_address(args.connect))
+        except OSError as e:
+            argparser.error(f'can\'t connect to {args.connect}: {e}')
+
+    if args.files and client is not None:
+        with client:
+            ret = _loop_files(
+                args.files,
+                args.test,
+                format=args.format,
+                timeout=args.timeout,
+                client=client,
+            )
+    elif args.files:
+        ret = _loop_files(
+            args.files, args.test, args.jobs, args.format, args.timeout
+        )
     else:
         _loop_input()
         ret = 0
@@ -14,10 +14,14 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import abc
+import contextlib
+import functools
 import typing as t
+import weakref
 
-from . import debug
+from . import cache, debug, search, sparse, stats
 from .sympy_types import (
+    Add,
     Mul,
     Number,
     Pow,
@@ -34,35 +38,62 @@ class AlgebraError(Exception):
 
 
 class Expression(abc.ABC):
+    __slots__ = ()
+
     @abc.abstractmethod
     def __repr__(self) -> str:
         ...
 
     @property
     @abc.abstractmethod
-    def free_variables(self) -> t.Set[Symbol]:
+    def free_variables(self) -> t.FrozenSet[Symbol]:
         """Get the variables in this expression.
         """
         ...
 
     def eval(
-        self, zeros: t.Set[SympyExpr] = None, nonzeros: t.Set[SympyExpr] = None
+        self,
+        zeros: t.Optional[t.AbstractSet[SympyExpr]] = None,
+        nonzeros: t.Optional[t.AbstractSet[SympyExpr]] = None,
     ) -> 'Algebraic':
         """ Wrapper for ``_eval`` to make sure ``zeros`` and ``nonzeros`` are
         not the empty set.
+
+        Inside an ``evaluation_memo`` scope, the result is looked up in the
+        memo table first. The debug output of nested evaluations is indented,
+        but only if it is printed at all.
         """
 
-        if zeros is None:
-            zeros = set()
+        zeros = frozenset() if zeros is None else frozenset(zeros)
+        nonzeros = frozenset() if nonzeros is None else frozenset(nonzeros)
+
+        if _eval_memo is not None:
+            key = (self, zeros, nonzeros)
+            ret = _eval_memo.get(key)
+            if ret is not None:
+                if stats.enabled:
+                    stats.count('eval memo hits')
+                return ret
 
-        if nonzeros is None:
-            nonzeros = set()
+        if stats.enabled:
+            stats.count('evaluations')
+
+        if debug.tracing:
+            with debug.indent():
+                ret = self._eval(zeros, nonzeros)
+        else:
+            ret = self._eval(zeros, nonzeros)
 
-        return self._eval(zeros, nonzeros)
+        if _eval_memo is not None:
+            _eval_memo.put(key, ret)
+
+        return ret
 
     @abc.abstractmethod
     def _eval(
-        self, zeros: t.Set[SympyExpr], nonzeros: t.Set[SympyExpr]
+        self,
+        zeros: t.AbstractSet[SympyExpr],
+        nonzeros: t.AbstractSet[SympyExpr],
     ) -> 'Algebraic':
         """
         Evaluate this expression in the given zeros and nonzeros.
@@ -76,54 +107,113 @@ class Expression(abc.ABC):
         ...
 
 
+_EvalKey = t.Tuple[Expression, t.FrozenSet[SympyExpr], t.FrozenSet[SympyExpr]]
+
+_eval_memo: 't.Optional[cache.LRUCache[_EvalKey, Algebraic]]' = None
+_eval_memo_size: t.Optional[int] = 65536
+
+
+def set_eval_memo_size(maxsize: t.Optional[int]) -> None:
+    """Set the maximum number of evaluations an ``evaluation_memo`` scope
+    remembers, 65536 by default. ``None`` makes the memo table unbounded.
+    """
+
+    global _eval_memo_size
+    _eval_memo_size = maxsize
+
+
+@contextlib.contextmanager
+def evaluation_memo() -> t.Iterator['cache.LRUCache[_EvalKey, Algebraic]']:
+    """Remember the results of ``Expression.eval`` within this scope, keyed
+    on the node and the zeros and nonzeros it is evaluated in. The same
+    subtrees are evaluated in the same zeros and nonzeros many times during
+    the case split of an equation, because the nodes are shared.
+
+    Nested scopes share the memo table of the outermost scope.
+    """
+
+    global _eval_memo
+
+    if _eval_memo is not None:
+        yield _eval_memo
+        return
+
+    _eval_memo = cache.LRUCache(_eval_memo_size)
+
+    try:
+        yield _eval_memo
+    finally:
+        _eval_memo = None
+
+
 class Equation(Expression):
+    __slots__ = ('lhs', 'rhs')
+
     lhs: 'Algebraic'
     rhs: 'Algebraic'
 
     def __init__(self, lhs: 'Algebraic', rhs: 'Algebraic') -> None:
-        self.lhs = lhs
-        self.rhs = rhs
+        object.__setattr__(self, 'lhs', lhs)
+        object.__setattr__(self, 'rhs', rhs)
+
+    def __setattr__(self, name: str, value: t.Any) -> None:
+        raise AttributeError(f'{type(self).__name__} is immutable')
+
+    def __reduce__(self) -> t.Tuple[t.Any, ...]:
+        return Equation, (self.lhs, self.rhs)
 
     def __repr__(self) -> str:
         return f'{self.lhs} = {self.rhs}'
 
     @property
-    def free_variables(self) -> t.Set[Symbol]:
+    def free_variables(self) -> t.FrozenSet[Symbol]:
         return self.lhs.free_variables | self.rhs.free_variables
 
-    def _eval(
-        self, zeros: t.Set[SympyExpr], nonzeros: t.Set[SympyExpr]
-    ) -> 'Algebraic':
+    def find_counterexample(
+        self,
+        zeros: t.Optional[t.AbstractSet[SympyExpr]] = None,
+        nonzeros: t.Optional[t.AbstractSet[SympyExpr]] = None,
+    ) -> t.Tuple['Algebraic', t.Optional[t.Dict[Symbol, str]]]:
+        """Check if the equation holds by evaluating the difference of its
+        sides in all zero/nonzero assignments of its condition variables.
+
+        Returns the result of the evaluation, which is zero if the equation
+        holds, and the first assignment in which it does not hold, mapping
+        each variable to either ``'zero'`` or ``'nonzero'``.
+        """
+
+        zeros = frozenset() if zeros is None else frozenset(zeros)
+        nonzeros = frozenset() if nonzeros is None else frozenset(nonzeros)
+
         diff = self.lhs - self.rhs
-        variables = diff.free_variables
+        variables = sorted(diff.condition_variables, key=str)
 
         debug.info('Checking equation: {}', self)
         debug.debug('SMF: {} = 0', diff)
         debug.debug('Variables {}', variables)
 
-        var_bits = {v: (1 << i) for i, v in enumerate(variables)}
+        with evaluation_memo():
+            failure = search.search(diff, variables, zeros, nonzeros)
 
-        for i in range(pow(2, len(variables))):
-            cur_zeros = zeros | {v for v, k in var_bits.items() if not i & k}
-            cur_nonzeros = nonzeros | {v for v, k in var_bits.items() if i & k}
+        if failure is None:
+            return Polynomial(0), None
 
-            debug.debug(
-                'Checking with zeros {}, nonzeros {}', cur_zeros, cur_nonzeros
-            )
+        i, eval = failure
+        var_zeros, _ = search.assignment(variables, i)
+        counterexample = {
+            v: 'zero' if v in var_zeros else 'nonzero' for v in variables
+        }
 
-            eval = diff.eval(cur_zeros, cur_nonzeros)
+        debug.info('Counterexample: {}', counterexample)
 
-            if not isinstance(eval, Polynomial) or not eval.is_zero:
-                debug.info(
-                    'Counterexample: {}',
-                    {
-                        v: 'zero' if v in cur_zeros else 'nonzero'
-                        for v in variables
-                    },
-                )
-                break
+        return eval, counterexample
 
-        return eval
+    def _eval(
+        self,
+        zeros: t.AbstractSet[SympyExpr],
+        nonzeros: t.AbstractSet[SympyExpr],
+    ) -> 'Algebraic':
+        return self.find_counterexample(zeros, nonzeros)[0]
 
 
 class Algebraic(Expression, abc.ABC):
@@ -138,10 +228,57 @@ class Algebraic(Expression, abc.ABC):
     Some constant folding is implemented in those methods, which should run
     before calling the corresponding methods on the subclasses. Subclasses must
     implement ``neg``, ``add``, ``mul``, and ``div`` methods.
+
+    Instances are immutable and hash-consed: they are only created through
+    ``_intern``, which returns the existing node if a structurally equal node
+    is alive already. Structural equality of nodes is therefore identity, and
+    subtrees that occur more than once are stored once. Because the nodes are
+    shared, the results of the algebraic operations are cached as well.
     """
 
+    __slots__: t.Tuple[str, ...] = ()
+
+    # The slot of ``compiled`` in the subclasses.
+    _compiled: t.Callable[[t.Mapping[str, t.Any]], t.Any]
+
+    @classmethod
+    def _intern(cls, *fields: t.Any) -> t.Any:
+        """Get the node of class ``cls`` with the given fields, which are
+        assigned to the slots of ``cls`` in order.
+        """
+
+        key = (cls, *fields)
+        node = _nodes.get(key)
+
+        if node is None:
+            node = object.__new__(cls)
+            for name, value in zip(cls.__slots__, fields):
+                object.__setattr__(node, name, value)
+            _nodes[key] = node
+
+            if stats.enabled:
+                stats.count(f'{cls.__name__} nodes')
+
+        return node
+
+    def __setattr__(self, name: str, value: t.Any) -> None:
+        raise AttributeError(f'{type(self).__name__} is immutable')
+
+    def _cache(self, name: str, value: t.Any) -> t.Any:
+        """Store ``value`` in the cache slot ``name`` and return it.
+        """
+
+        object.__setattr__(self, name, value)
+        return value
+
+    @property
     @abc.abstractmethod
-    def __eq__(self, other: t.Any) -> bool:
+    def condition_variables(self) -> t.FrozenSet[Symbol]:
+        """Get the variables that occur in a condition of this expression,
+        i.e. in the denominator of an ``SMF0`` or the condition of an
+        ``SMFN``. Only these variables can influence which branches are taken
+        when evaluating, so ``Equation`` only has to case split over them.
+        """
         ...
 
     @property
@@ -157,7 +294,7 @@ class Algebraic(Expression, abc.ABC):
         return False
 
     def __neg__(self) -> 'Algebraic':
-        return self.neg()
+        return _operation('neg', self)
 
     @abc.abstractmethod
     def neg(self) -> 'Algebraic':
@@ -170,7 +307,10 @@ class Algebraic(Expression, abc.ABC):
         if other.is_zero:
             return self
 
-        return self.add(other)
+        if _representation == 'diagram' and _is_diagram(self, other):
+            return _apply('add', self, other)
+
+        return _operation('add', self, other)
 
     @abc.abstractmethod
     def add(self, other: 'Algebraic') -> 'Algebraic':
@@ -195,7 +335,10 @@ class Algebraic(Expression, abc.ABC):
         if other.is_one:
             return self
 
-        return self.mul(other)
+        if _representation == 'diagram' and _is_diagram(self, other):
+            return _apply('mul', self, other)
+
+        return _operation('mul', self, other)
 
     @abc.abstractmethod
     def mul(self, other: 'Algebraic') -> 'Algebraic':
@@ -208,52 +351,325 @@ class Algebraic(Expression, abc.ABC):
         if other.is_one:
             return self
 
-        return self.div(other)
+        if _representation == 'diagram' and _is_diagram(self, other):
+            return _apply('div', self, other)
+
+        return _operation('div', self, other)
 
     @abc.abstractmethod
     def div(self, other: 'Algebraic') -> 'Algebraic':
         ...
 
+    def assign(self, variable: Symbol, nonzero: bool) -> 'Algebraic':
+        """Simplify this expression where ``variable`` is nonzero, or zero.
+        Unlike the result of ``eval``, the result is equivalent to this
+        expression under that assumption, so more variables can be assigned
+        in it one at a time.
+        """
+
+        if variable not in self.free_variables:
+            return self
 
-class Polynomial(Algebraic):
-    _factorized: bool
-    terms: SympyExpr
+        key = ('assign', self, variable, nonzero)
+        ret = _operation_cache.get(key)
+
+        if ret is None:
+            ret = self._assign(variable, nonzero)
+            _operation_cache.put(key, ret)
+
+        return ret
+
+    @abc.abstractmethod
+    def _assign(self, variable: Symbol, nonzero: bool) -> 'Algebraic':
+        ...
+
+    @property
+    def compiled(self) -> t.Callable[[t.Mapping[str, t.Any]], t.Any]:
+        """Get this expression compiled to a Python function, which evaluates
+        it at a mapping of the names of its variables to their values. See
+        ``codegen``. The function is compiled on first use.
+        """
+
+        try:
+            return self._compiled
+        except AttributeError:
+            from . import codegen
+
+            return self._cache('_compiled', codegen.compile_function(self))
+
+
+_nodes: 'weakref.WeakValueDictionary[t.Tuple[t.Any, ...], Algebraic]'
+_nodes = weakref.WeakValueDictionary()
+
+_operation_cache: 'cache.LRUCache[t.Tuple[t.Any, ...], Algebraic]'
+_operation_cache = cache.LRUCache(maxsize=65536)
+
+
+def set_operation_cache_size(maxsize: t.Optional[int]) -> None:
+    """Set the maximum number of results of algebraic operations to remember.
+    ``None`` makes the cache unbounded, zero disables it.
+    """
+
+    _operation_cache.resize(maxsize)
+
+
+def operation_cache_info() -> cache.CacheInfo:
+    return _operation_cache.info()
+
+
+def clear_operation_cache() -> None:
+    _operation_cache.clear()
+
+
+def _operation(name: str, *args: Algebraic) -> Algebraic:
+    """Apply the operation ``name`` of the first argument to the others. The
+    nodes are interned, so the arguments identify the result.
+    """
 
-    def __init__(self, term: t.Union[float, int, str, SympyExpr]) -> None:
-        self._factorized = False
+    key = (name, *args)
+    ret = _operation_cache.get(key)
 
-        if isinstance(term, SympyExprTypes):
-            self.terms = term
+    if ret is None:
+        if stats.enabled:
+            with stats.timer('operations'):
+                ret = getattr(args[0], name)(*args[1:])
         else:
+            ret = getattr(args[0], name)(*args[1:])
+
+        _operation_cache.put(key, ret)
+    elif stats.enabled:
+        stats.count('operation cache hits')
+
+    return ret
+
+
+_Factorization = t.Tuple[SympyExpr, t.Sequence[SympyExpr]]
+
+_factor_cache: 'cache.LRUCache[SympyExpr, _Factorization]'
+_factor_cache = cache.LRUCache(maxsize=4096)
+
+
+def set_factor_cache_size(maxsize: t.Optional[int]) -> None:
+    """Set the maximum number of factorizations to remember. ``None`` makes
+    the cache unbounded, zero disables it.
+    """
+
+    _factor_cache.resize(maxsize)
+
+
+def factor_cache_info() -> cache.CacheInfo:
+    return _factor_cache.info()
+
+
+def clear_factor_cache() -> None:
+    _factor_cache.clear()
+
+
+# A compiled polynomial: its expanded terms with the variables of each term.
+_Kernel = t.Tuple[t.Tuple[SympyExpr, t.FrozenSet[Symbol]], ...]
+
+_kernel_cache: 'cache.LRUCache[SympyExpr, _Kernel]'
+_kernel_cache = cache.LRUCache(maxsize=4096)
+
+
+def clear_kernel_cache() -> None:
+    _kernel_cache.clear()
+
+
+def _compile(terms: SympyExpr) -> _Kernel:
+    kernel = _kernel_cache.get(terms)
+
+    if kernel is None:
+        expanded = terms.expand()
+        monomials = expanded.args if isinstance(expanded, Add) else (expanded,)
+        kernel = tuple((m, frozenset(m.free_symbols)) for m in monomials)
+        _kernel_cache.put(terms, kernel)
+
+    return kernel
+
+
+def _substitute(
+    terms: SympyExpr, zeros: t.AbstractSet[SympyExpr]
+) -> SympyExpr:
+    """Substitute 0 for ``zeros`` in ``terms``. Variables are substituted by
+    dropping the terms of the compiled polynomial that they occur in, instead
+    of sympy's ``subs``, which rewrites the whole expression tree. Other
+    zeros, like the irreducible factors of conditions, still need ``subs``.
+    """
+
+    if isinstance(terms, sparse.SparsePoly):
+        return terms.subs({zero: 0 for zero in zeros})
+
+    if terms in zeros:
+        return Number(0)
+
+    variables = terms.free_symbols
+    shared = [
+        zero for zero in zeros if not variables.isdisjoint(zero.free_symbols)
+    ]
+    if not shared:
+        return terms
+
+    ret = terms
+
+    if any(isinstance(zero, Symbol) for zero in shared):
+        kernel = _compile(terms)
+        kept = [m for m, v in kernel if v.isdisjoint(zeros)]
+        if len(kept) != len(kernel):
+            ret = Add(*kept)
+
+    others = {zero: 0 for zero in shared if not isinstance(zero, Symbol)}
+    if others and ret != 0:
+        ret = ret.subs(others)
+
+    return ret
+
+
+BACKENDS = ('sympy', 'sparse')
+
+_backend = 'sympy'
+
+
+def set_backend(backend: str) -> None:
+    """Set the representation of the terms of new polynomials: ``'sympy'``
+    for sympy expressions, or ``'sparse'`` for ``sparse.SparsePoly``.
+    Expressions built with different backends can't be combined.
+    """
+
+    global _backend
+
+    if backend not in BACKENDS:
+        raise ValueError(f'Unknown polynomial backend: {backend}')
+
+    _backend = backend
+
+    # The numbers of both backends compare equal, so interned nodes and
+    # cached results of the old backend would be returned for the new one.
+    _nodes.clear()
+    _operation_cache.clear()
+    _factor_cache.clear()
+    _kernel_cache.clear()
+
+
+def get_backend() -> str:
+    return _backend
+
+
+REPRESENTATIONS = ('tree', 'diagram')
+
+_representation = 'tree'
+
+
+def set_representation(representation: str) -> None:
+    """Set the representation of nested conditionals. ``'tree'`` builds
+    ``SMFN`` trees as described in the paper. ``'diagram'`` keeps them
+    ordered and reduced like a decision diagram: every ``SMFN`` tests a
+    single irreducible factor, the factors on every path are tested in a
+    global order and at most once, and the operators work on the diagrams by
+    Shannon expansion on the first factor.
+    """
+
+    global _representation
+
+    if representation not in REPRESENTATIONS:
+        raise ValueError(f'Unknown representation: {representation}')
+
+    _representation = representation
+    _operation_cache.clear()
+
+
+def get_representation() -> str:
+    return _representation
+
+
+def _factor(terms: SympyExpr) -> _Factorization:
+    """Factor ``terms``, returning the factored expression and its distinct
+    prime factors. Factorizations are shared by all polynomials through a
+    process-wide LRU cache.
+    """
+
+    cached = _factor_cache.get(terms)
+    if cached is not None:
+        if stats.enabled:
+            stats.count('factor cache hits')
+        return cached
+
+    if stats.enabled:
+        stats.count('factor calls')
+        with stats.timer('factor'):
+            return _factor_uncached(terms)
+
+    return _factor_uncached(terms)
+
+
+def _factor_uncached(terms: SympyExpr) -> _Factorization:
+    if isinstance(terms, sparse.SparsePoly):
+        ret = (terms, terms.factor_list())
+        _factor_cache.put(terms, ret)
+        return ret
+
+    factored = terms.factor()
+
+    if isinstance(factored, (Mul, Pow)):
+        factors = factored.as_terms()[1]
+    else:
+        factors = [factored]
+
+    # Only the roots of the factors matter, so pick the same sign of a factor
+    # however it was written, or it doesn't match its negation among the
+    # zeros and nonzeros.
+    factors = tuple(-f if f.could_extract_minus_sign() else f for f in factors)
+
+    _factor_cache.put(terms, (factored, factors))
+    _factor_cache.put(factored, (factored, factors))
+
+    return factored, factors
+
+
+class Polynomial(Algebraic):
+    __slots__ = ('terms', '_free_variables', '_compiled', '__weakref__')
+
+    terms: SympyExpr
+    _free_variables: t.FrozenSet[Symbol]
+
+    def __new__(
+        cls, term: t.Union[float, int, str, SympyExpr, sparse.SparsePoly]
+    ) -> 'Polynomial':
+        if _backend == 'sparse':
+            term = sparse.convert(term)
+        elif isinstance(term, sparse.SparsePoly):
+            term = term.as_expr()
+        elif not isinstance(term, SympyExprTypes):
             # Mypy can't determine that ``term`` is not of type ``SympyExpr`` here.
-            self.terms = sympify(term)  # type: ignore
+            term = sympify(term)  # type: ignore
 
-    def __eq__(self, other: t.Any) -> bool:
-        if not isinstance(other, Polynomial):
-            return False
+        return cls._intern(term)
 
-        return self.terms == other.terms
+    def __reduce__(self) -> t.Tuple[t.Any, ...]:
+        return Polynomial, (self.terms,)
 
     def __repr__(self) -> str:
         if self.is_constant:
             return repr(self.terms)
         else:
-            return f'({self.terms.factor()})'
+            return f'({_factor(self.terms)[0]})'
 
     @property
     def factors(self) -> t.Sequence[SympyExpr]:
-        if not self._factorized:
-            self._factorized = True
-            self.terms = self.terms.factor()
+        return _factor(self.terms)[1]
 
-        if isinstance(self.terms, (Mul, Pow)):
-            return self.terms.as_terms()[1]
-        else:
-            return [self.terms]
+    @property
+    def free_variables(self) -> t.FrozenSet[Symbol]:
+        try:
+            return self._free_variables
+        except AttributeError:
+            return self._cache(
+                '_free_variables', frozenset(self.terms.free_symbols)
+            )
 
     @property
-    def free_variables(self) -> t.Set[Symbol]:
-        return self.terms.free_symbols
+    def condition_variables(self) -> t.FrozenSet[Symbol]:
+        return frozenset()
 
     @property
     def is_zero(self) -> bool:
@@ -315,9 +731,10 @@ class Polynomial(Algebraic):
             f'Can\'t divide types {type(self)} and {type(other)}.'
         )
 
-    @debug.indent()  # type: ignore
-    def _eval(  # type: ignore
-        self, zeros: t.Set[SympyExpr], nonzeros: t.Set[SympyExpr]
+    def _eval(
+        self,
+        zeros: t.AbstractSet[SympyExpr],
+        nonzeros: t.AbstractSet[SympyExpr],
     ) -> 'Algebraic':
         debug.debug(
             'Evaluating Polynomial {} in zeros {}, nonzeros {}',
@@ -328,44 +745,77 @@ class Polynomial(Algebraic):
 
         if self.is_constant:
             ret = self.terms
+        elif stats.enabled:
+            stats.count('subs calls')
+            with stats.timer('subs'):
+                ret = self._substitute(zeros, nonzeros)
         else:
-            factors = set(self.factors)
-
-            ret = factors.pop()
-            for f in factors:
-                if f not in nonzeros:
-                    ret *= f
-
-            ret = ret.subs({zero: 0 for zero in zeros})
+            ret = self._substitute(zeros, nonzeros)
 
         debug.debug('Result: {}', ret)
         return Polynomial(ret)
 
+    def _substitute(
+        self,
+        zeros: t.AbstractSet[SympyExpr],
+        nonzeros: t.AbstractSet[SympyExpr],
+    ) -> SympyExpr:
+        """Multiply the factors, except the nonzero ones after the first, with
+        0 substituted for the zeros.
+        """
+
+        factors = self.factors
+        ret = _substitute(factors[0], zeros)
+
+        for f in factors[1:]:
+            if ret == 0:
+                break
+
+            if f not in nonzeros:
+                ret *= _substitute(f, zeros)
+
+        return ret
+
+    def _assign(self, variable: Symbol, nonzero: bool) -> Algebraic:
+        if nonzero:
+            return self
+
+        return Polynomial(_substitute(self.terms, {variable}))
+
 
 class SMF(Algebraic):
-    pass
+    __slots__ = ()
 
 
 class SMF0(SMF):
+    __slots__ = ('lhs', 'rhs', '_free_variables', '_compiled', '__weakref__')
+
     lhs: Polynomial
     rhs: Polynomial
+    _free_variables: t.FrozenSet[Symbol]
 
-    def __init__(self, lhs: Polynomial, rhs: Polynomial) -> None:
-        self.lhs = lhs
-        self.rhs = rhs
-
-    def __eq__(self, other: t.Any) -> bool:
-        if not isinstance(other, SMF0):
-            return False
+    def __new__(cls, lhs: Polynomial, rhs: Polynomial) -> 'SMF0':
+        return cls._intern(lhs, rhs)
 
-        return self.lhs == other.lhs and self.rhs == other.rhs
+    def __reduce__(self) -> t.Tuple[t.Any, ...]:
+        return SMF0, (self.lhs, self.rhs)
 
     def __repr__(self) -> str:
         return f'({self.lhs} / {self.rhs})'
 
     @property
-    def free_variables(self) -> t.Set[Symbol]:
-        return self.lhs.free_variables | self.rhs.free_variables
+    def free_variables(self) -> t.FrozenSet[Symbol]:
+        try:
+            return self._free_variables
+        except AttributeError:
+            return self._cache(
+                '_free_variables',
+                self.lhs.free_variables | self.rhs.free_variables,
+            )
+
+    @property
+    def condition_variables(self) -> t.FrozenSet[Symbol]:
+        return self.rhs.free_variables
 
     def neg(self) -> Algebraic:
         return -self.lhs / self.rhs
@@ -439,9 +889,10 @@ class SMF0(SMF):
             f'Can\'t divide types {type(self)} and {type(other)}.'
         )
 
-    @debug.indent()  # type: ignore
-    def _eval(  # type: ignore
-        self, zeros: t.Set[SympyExpr], nonzeros: t.Set[SympyExpr]
+    def _eval(
+        self,
+        zeros: t.AbstractSet[SympyExpr],
+        nonzeros: t.AbstractSet[SympyExpr],
     ) -> 'Algebraic':
         debug.debug(
             'Evaluating SMF0 {} in zeros {}, nonzeros {}',
@@ -452,23 +903,45 @@ class SMF0(SMF):
 
         lhs = self.lhs.eval(zeros, nonzeros)
         rhs = self.rhs.eval(zeros, nonzeros)
+        ret = lhs * rhs
 
-        debug.debug('Result: {}', lhs * rhs)
-        return lhs * rhs
+        debug.debug('Result: {}', ret)
+        return ret
+
+    def _assign(self, variable: Symbol, nonzero: bool) -> Algebraic:
+        if nonzero:
+            return self
+
+        return self.lhs.assign(variable, False) / self.rhs.assign(
+            variable, False
+        )
 
 
 class SMFN(SMF):
+    __slots__ = (
+        'cond',
+        'P',
+        'Q',
+        '_free_variables',
+        '_condition_variables',
+        '_compiled',
+        '__weakref__',
+    )
+
     cond: Polynomial
     P: Algebraic
     Q: Algebraic
+    _free_variables: t.FrozenSet[Symbol]
+    _condition_variables: t.FrozenSet[Symbol]
 
-    def __init__(self, cond: Polynomial, P: Algebraic, Q: Algebraic) -> None:
+    def __new__(cls, cond: Polynomial, P: Algebraic, Q: Algebraic) -> 'SMFN':
         """DO NOT call this method directly! Call SMFN.make() instead.
         """
 
-        self.cond = cond
-        self.P = P
-        self.Q = Q
+        return cls._intern(cond, P, Q)
+
+    def __reduce__(self) -> t.Tuple[t.Any, ...]:
+        return SMFN, (self.cond, self.P, self.Q)
 
     @classmethod
     def make(cls, cond: Polynomial, P: Algebraic, Q: Algebraic) -> Algebraic:
@@ -484,7 +957,11 @@ class SMFN(SMF):
         Then (c_1 * c_1 = 0) -> (cond = 0)
         But (c_1 = 0) -> (cond = 0) is sufficient
 
-        Then apply the optimizations described in section 2.4.
+        Then apply the optimizations described in section 2.4, generalized
+        to the whole branches: in P the factors of cond are known to be
+        nonzero, and in Q their product is known to be zero, so the
+        conditions and leaves below that these facts decide are simplified
+        with ``_restrict``.
         """
 
         factors = cond.factors
@@ -498,16 +975,11 @@ class SMFN(SMF):
         else:
             cond = Polynomial(factors[0])
 
-        if isinstance(P, SMFN) and P.cond == cond:
-            P = P.P
+        P = _restrict(P, cond, True)
+        Q = _restrict(Q, cond, False)
 
-        if isinstance(Q, SMFN) and Q.cond == cond:
-            Q = Q.Q
-        elif (
-            (isinstance(Q, SMF0) and (cond in (Q.lhs, Q.rhs)))
-            or (isinstance(Q, Polynomial) and Q == cond)
-        ):
-            Q = Polynomial(0)
+        if _representation == 'diagram':
+            return _ite_factors(cond, P, Q)
 
         if P == Q:
             return P
@@ -518,25 +990,33 @@ class SMFN(SMF):
         else:
             return cls(cond, P, Q)
 
-    def __eq__(self, other: t.Any) -> bool:
-        if not isinstance(other, SMFN):
-            return False
-
-        return (
-            self.cond == other.cond and self.P == other.P and self.Q == other.Q
-        )
-
     def __repr__(self) -> str:
         cond = self.cond
         return f'(({cond}/{cond}) * {self.P} + (1 - {cond}/{cond}) * {self.Q})'
 
     @property
-    def free_variables(self) -> t.Set[Symbol]:
-        return (
-            self.cond.free_variables
-            | self.P.free_variables
-            | self.Q.free_variables
-        )
+    def free_variables(self) -> t.FrozenSet[Symbol]:
+        try:
+            return self._free_variables
+        except AttributeError:
+            return self._cache(
+                '_free_variables',
+                self.cond.free_variables
+                | self.P.free_variables
+                | self.Q.free_variables,
+            )
+
+    @property
+    def condition_variables(self) -> t.FrozenSet[Symbol]:
+        try:
+            return self._condition_variables
+        except AttributeError:
+            return self._cache(
+                '_condition_variables',
+                self.cond.free_variables
+                | self.P.condition_variables
+                | self.Q.condition_variables,
+            )
 
     def neg(self) -> Algebraic:
         return SMFN.make(self.cond, -self.P, -self.Q)
@@ -579,9 +1059,10 @@ class SMFN(SMF):
 
         raise AlgebraError(f'Can\'t add types {type(self)} and {type(other)}.')
 
-    @debug.indent()  # type: ignore
-    def _eval(  # type: ignore
-        self, zeros: t.Set[SympyExpr], nonzeros: t.Set[SympyExpr]
+    def _eval(
+        self,
+        zeros: t.AbstractSet[SympyExpr],
+        nonzeros: t.AbstractSet[SympyExpr],
     ) -> 'Algebraic':
         """
         Evaluate in the given zero terms and nonzero terms. First the condional
@@ -603,14 +1084,14 @@ class SMFN(SMF):
         cond = t.cast(Polynomial, self.cond.eval(zeros, nonzeros))
         roots = cond.factors
 
-        if cond.is_zero or zeros.intersection(roots):
+        if cond.is_zero or not zeros.isdisjoint(roots):
             ret = self.Q.eval(zeros, nonzeros)
             debug.debug('Result: {}', ret)
             return ret
 
         P = self.P.eval(zeros, nonzeros | set(roots))
 
-        if cond.is_constant or nonzeros.issuperset(roots):
+        if cond.is_constant or nonzeros >= set(roots):
             debug.debug('Result: {}', P)
             return P
 
@@ -632,3 +1113,208 @@ class SMFN(SMF):
 
         debug.debug('Result: {}', ret)
         return ret
+
+    def _assign(self, variable: Symbol, nonzero: bool) -> Algebraic:
+        """Substitute 0 for a zero ``variable``, and drop a nonzero
+        ``variable`` from the factors of the conditions.
+        """
+
+        if not nonzero:
+            cond = self.cond.assign(variable, False)
+        elif variable in self.cond.factors:
+            cond = Polynomial(1)
+            for f in self.cond.factors:
+                if f != variable:
+                    cond = Polynomial(cond.terms * f)
+        else:
+            cond = self.cond
+
+        P = self.P.assign(variable, nonzero)
+        Q = self.Q.assign(variable, nonzero)
+
+        if cond is self.cond and P is self.P and Q is self.Q:
+            return self
+
+        return SMFN.make(t.cast(Polynomial, cond), P, Q)
+
+
+def _restrict(f: Algebraic, cond: Polynomial, nonzero: bool) -> Algebraic:
+    """Simplify ``f`` where each factor of the squarefree ``cond`` is known to
+    be nonzero, or ``cond`` is known to be zero. The conditions below that
+    this decides are replaced by the branch they select, and if ``cond`` is
+    zero, the fractions with ``cond`` as numerator or dividing their
+    denominator, and the polynomials equal to ``cond``, are replaced by 0.
+    """
+
+    # Whether cond is nonzero only matters to the conditions, but the leaves
+    # can be equal to cond.
+    if nonzero:
+        affected = f.condition_variables
+    else:
+        affected = f.free_variables
+
+    if affected.isdisjoint(cond.free_variables):
+        return f
+
+    key = ('restrict', f, cond, nonzero)
+    ret = _operation_cache.get(key)
+    if ret is not None:
+        return ret
+
+    roots = frozenset(cond.factors)
+    ret = f
+
+    if isinstance(f, SMFN):
+        factors = f.cond.factors
+
+        if nonzero and roots.issuperset(factors):
+            ret = _restrict(f.P, cond, nonzero)
+        elif not nonzero and roots.issubset(factors):
+            ret = _restrict(f.Q, cond, nonzero)
+        else:
+            P = _restrict(f.P, cond, nonzero)
+            Q = _restrict(f.Q, cond, nonzero)
+
+            # The branches were simplified with f.cond when f was made, so
+            # only the reduction of SMFN.make is left.
+            if P == Q:
+                ret = P
+            elif P is not f.P or Q is not f.Q:
+                ret = SMFN(f.cond, P, Q)
+    elif not nonzero:
+        if isinstance(f, SMF0):
+            if f.lhs == cond or roots.issubset(f.rhs.factors):
+                ret = Polynomial(0)
+        elif f == cond:
+            ret = Polynomial(0)
+
+    _operation_cache.put(key, ret)
+    return ret
+
+
+# Decision diagrams. An ``SMFN`` in a diagram tests a single irreducible
+# factor, and the factors of the ``SMFN``s below it come later in the order of
+# ``_cond_key``. The diagram is reduced: no ``SMFN`` has equal branches, and
+# since the nodes are interned, equal subdiagrams are shared.
+
+
+@functools.lru_cache(maxsize=4096)
+def _cond_key(cond: Polynomial) -> str:
+    return str(cond.terms)
+
+
+def _top(f: Algebraic) -> t.Optional[Polynomial]:
+    return f.cond if isinstance(f, SMFN) else None
+
+
+def _first(*conds: t.Optional[Polynomial]) -> Polynomial:
+    return min((c for c in conds if c is not None), key=_cond_key)
+
+
+def _cofactor(f: Algebraic, cond: Polynomial, nonzero: bool) -> Algebraic:
+    """Get the branch of ``f`` in which ``cond`` is nonzero or zero, where
+    ``cond`` is not tested below the top of ``f``.
+    """
+
+    if isinstance(f, SMFN) and f.cond == cond:
+        return f.P if nonzero else f.Q
+
+    return f
+
+
+def _is_diagram(f: Algebraic, g: Algebraic) -> bool:
+    return isinstance(f, SMFN) or isinstance(g, SMFN)
+
+
+def _node(cond: Polynomial, P: Algebraic, Q: Algebraic) -> Algebraic:
+    """Get the reduced node testing ``cond``, whose branches test later
+    factors only.
+    """
+
+    # Leaves that are zero in the roots of cond, like in SMFN.make.
+    if (isinstance(Q, SMF0) and cond in (Q.lhs, Q.rhs)) or Q == cond:
+        Q = Polynomial(0)
+
+    if P == Q:
+        return P
+
+    return SMFN(cond, P, Q)
+
+
+def _ite(cond: Polynomial, P: Algebraic, Q: Algebraic) -> Algebraic:
+    """Get the diagram of ``P`` if the irreducible factor ``cond`` is nonzero,
+    and ``Q`` otherwise.
+    """
+
+    if P == Q:
+        return P
+
+    key = ('ite', cond, P, Q)
+    ret = _operation_cache.get(key)
+    if ret is not None:
+        return ret
+
+    top = _first(cond, _top(P), _top(Q))
+
+    if top == cond:
+        ret = _node(cond, _cofactor(P, cond, True), _cofactor(Q, cond, False))
+    else:
+        ret = _node(
+            top,
+            _ite(cond, _cofactor(P, top, True), _cofactor(Q, top, True)),
+            _ite(cond, _cofactor(P, top, False), _cofactor(Q, top, False)),
+        )
+
+    _operation_cache.put(key, ret)
+    return ret
+
+
+def _ite_factors(cond: Polynomial, P: Algebraic, Q: Algebraic) -> Algebraic:
+    """Get the diagram of ``P`` if ``cond`` is nonzero, and ``Q`` otherwise.
+    A product of factors is nonzero if each factor is nonzero.
+    """
+
+    if cond.is_zero:
+        return Q
+
+    if cond.is_constant:
+        return P
+
+    ret = P
+    for f in cond.factors:
+        ret = _ite(Polynomial(f), ret, Q)
+
+    return ret
+
+
+_APPLY = {
+    'add': lambda f, g: f + g,
+    'mul': lambda f, g: f * g,
+    'div': lambda f, g: f / g,
+}
+
+
+def _apply(name: str, f: Algebraic, g: Algebraic) -> Algebraic:
+    """Apply the operation ``name`` to diagrams by Shannon expansion on the
+    first factor that either of them tests.
+    """
+
+    key = ('apply', name, f, g)
+    ret = _operation_cache.get(key)
+    if ret is not None:
+        return ret
+
+    top = _first(_top(f), _top(g))
+    op = _APPLY[name]
+
+    # The operations on the branches can introduce new tests, for example of
+    # the denominators of added fractions, so the branches are combined with
+    # _ite instead of _node to keep the diagram ordered.
+    ret = _ite(
+        top,
+        op(_cofactor(f, top, True), _cofactor(g, top, True)),
+        op(_cofactor(f, top, False), _cofactor(g, top, False)),
+    )
+
+    _operation_cache.put(key, ret)
+    return ret
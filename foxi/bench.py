@@ -0,0 +1,366 @@
+# Copyright (c) 2019 Olmo Kramer <olmo.kramer@protonmail.com>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Benchmarks for foxi. Run with ``python -m foxi.bench``.
+
+The results can be saved as JSON with ``--output``, and two saved runs, for
+example of two revisions or two backends, compared with ``--compare``.
+"""
+
+import json
+import platform
+import sys
+import time
+import timeit
+import typing as t
+
+from fractions import Fraction
+
+import foxi
+from foxi import ast, codegen, debug, generate, parser, sparse
+from foxi.sympy_types import Add, Mul, Pow, Rational, SympyExpr
+
+_Results = t.Dict[str, float]
+
+
+def _per_call(stmt: t.Callable[[], t.Any], number: int) -> float:
+    """Get the best time of a call to ``stmt`` over a few repetitions, in
+    nanoseconds.
+    """
+
+    return min(timeit.repeat(stmt, number=number, repeat=5)) / number * 1e9
+
+
+def bench_debug(number: int = 100000) -> _Results:
+    """Measure the overhead of disabled debug tracing on the hot path. The
+    disabled print functions should cost about as much as an empty call, and
+    evaluating an expression should cost about as much as calling ``_eval``
+    directly.
+    """
+
+    def empty(fmt: str, *args: t.Any) -> None:
+        pass
+
+    @debug.indent()
+    def indented() -> None:
+        pass
+
+    expr = foxi.parse('x / y + (x * y) / (x + y)')
+    assert isinstance(expr, foxi.Algebraic)
+    zeros: t.FrozenSet[SympyExpr] = frozenset()
+    nonzeros = frozenset(expr.free_variables)
+
+    level = debug.get_level()
+    debug.set_level(debug.DebugLevel.NONE)
+
+    try:
+        return {
+            'empty call': _per_call(lambda: empty('{}', 1), number),
+            'debug.debug': _per_call(lambda: debug.debug('{}', 1), number),
+            'debug.indent() frame': _per_call(indented, number),
+            'Expression._eval': _per_call(
+                lambda: expr._eval(zeros, nonzeros), number // 100
+            ),
+            'Expression.eval': _per_call(
+                lambda: expr.eval(zeros, nonzeros), number // 100
+            ),
+        }
+    finally:
+        debug.set_level(level)
+
+
+def _variables(n: int) -> str:
+    """A cyclic sum of ``n`` fractions of ``n`` variables, equated to the
+    same sum in reverse order.
+    """
+
+    terms = [f'x{i} / x{(i + 1) % n}' for i in range(n)]
+    return f'{" + ".join(terms)} = {" + ".join(reversed(terms))}'
+
+
+def _depth(n: int) -> str:
+    """``x`` equated to ``n`` nested double reciprocals of ``x``.
+    """
+
+    return 'x = ' + '1 / (1 / (' * n + 'x' + '))' * n
+
+
+def _fractions(n: int) -> str:
+    """A sum of ``n`` fractions of two variables with distinct denominators,
+    equated to the same sum in reverse order.
+    """
+
+    terms = [f'x / (y + {i})' for i in range(n)]
+    return f'{" + ".join(terms)} = {" + ".join(reversed(terms))}'
+
+
+def _random(n: int) -> str:
+    """A random TRUE equation over ``n`` variables, from a fixed seed.
+    """
+
+    (_, expr), = generate.generate(1, variables=n, verdict='TRUE', seed=n)
+    return expr
+
+
+_FAMILIES: t.Dict[str, t.Callable[[int], str]] = {
+    'variables': _variables,
+    'depth': _depth,
+    'fractions': _fractions,
+    'random': _random,
+}
+
+
+def _clear_caches() -> None:
+    ast.clear_operation_cache()
+    ast.clear_factor_cache()
+    ast.clear_kernel_cache()
+
+
+def _best_of(stmt: t.Callable[[], t.Any], repeat: int) -> float:
+    """Get the best time of a cold call to ``stmt``, in nanoseconds.
+    """
+
+    times = []
+
+    for _ in range(repeat):
+        _clear_caches()
+        start = time.perf_counter()
+        stmt()
+        times.append(time.perf_counter() - start)
+
+    return min(times) * 1e9
+
+
+def bench_stages(max_size: int = 5, repeat: int = 3) -> _Results:
+    """Time the parse, build and evaluate stages of proving the equations of
+    each family, for sizes 1 to ``max_size``. Parsing only builds the syntax
+    tree, building applies the ``Algebraic`` operators to it, and evaluating
+    searches the assignments with ``Equation._eval``. The operation and
+    factorization caches are cleared before every call.
+    """
+
+    results = {}
+
+    for family, make in _FAMILIES.items():
+        for size in range(1, max_size + 1):
+            text = make(size)
+            tree = parser.syntax_tree(text)
+            expr = parser.from_syntax_tree(tree)
+            assert isinstance(expr, ast.Equation)
+
+            label = f'{family}/{size}'
+            results[f'{label} parse'] = _best_of(
+                lambda: parser.syntax_tree(text), repeat
+            )
+            results[f'{label} build'] = _best_of(
+                lambda: parser.from_syntax_tree(tree), repeat
+            )
+            results[f'{label} eval'] = _best_of(
+                lambda: expr._eval(frozenset(), frozenset()), repeat
+            )
+
+    return results
+
+
+def _interpret_terms(terms: SympyExpr, values: t.Mapping[str, t.Any]) -> t.Any:
+    if isinstance(terms, sparse.SparsePoly):
+        terms = terms.as_expr()
+
+    if isinstance(terms, Add):
+        return sum(_interpret_terms(arg, values) for arg in terms.args)
+
+    if isinstance(terms, Mul):
+        ret = Fraction(1)
+        for arg in terms.args:
+            ret *= _interpret_terms(arg, values)
+        return ret
+
+    if isinstance(terms, Pow):
+        # The exponents of polynomials are positive integers.
+        base, exp = terms.args
+        assert isinstance(exp, Rational)
+        return _interpret_terms(base, values) ** exp.p
+
+    if isinstance(terms, Rational):
+        return Fraction(terms.p, terms.q)
+
+    return values[str(terms)]
+
+
+def _interpret(expr: ast.Algebraic, values: t.Mapping[str, t.Any]) -> t.Any:
+    """Evaluate ``expr`` at ``values`` by walking its nodes, like
+    ``Algebraic.compiled`` does without the compilation.
+    """
+
+    if isinstance(expr, ast.Polynomial):
+        return _interpret_terms(expr.terms, values)
+
+    if isinstance(expr, ast.SMF0):
+        rhs = _interpret_terms(expr.rhs.terms, values)
+        return _interpret_terms(expr.lhs.terms, values) / rhs if rhs else 0
+
+    assert isinstance(expr, ast.SMFN)
+
+    if _interpret_terms(expr.cond.terms, values):
+        return _interpret(expr.P, values)
+    else:
+        return _interpret(expr.Q, values)
+
+
+def bench_compiled(max_size: int = 5, number: int = 100) -> _Results:
+    """Time the numeric evaluation of the difference of the sides of the
+    equations of each family at a point, by walking its nodes and with the
+    function of ``Algebraic.compiled``, and the compilation itself. The
+    variables are nonzero in the point, so every condition is evaluated.
+    """
+
+    results = {}
+
+    for family, make in _FAMILIES.items():
+        for size in range(1, max_size + 1):
+            expr = parser.from_syntax_tree(parser.syntax_tree(make(size)))
+            assert isinstance(expr, ast.Equation)
+            diff = expr.lhs - expr.rhs
+            values = {
+                str(v): Fraction(i + 2, 3)
+                for i, v in enumerate(diff.free_variables)
+            }
+
+            label = f'{family}/{size}'
+            results[f'{label} compile'] = _best_of(
+                lambda: codegen.compile_function(diff), 3
+            )
+            results[f'{label} interpret'] = _per_call(
+                lambda: _interpret(diff, values), number
+            )
+            results[f'{label} compiled'] = _per_call(
+                lambda: diff.compiled(values), number
+            )
+
+    return results
+
+
+_BENCHMARKS: t.Dict[str, t.Callable[[], _Results]] = {
+    'debug': bench_debug,
+    'stages': bench_stages,
+    'compiled': bench_compiled,
+}
+
+
+def _metadata() -> t.Dict[str, str]:
+    return {
+        'foxi': foxi.__version__,
+        'backend': ast.get_backend(),
+        'representation': ast.get_representation(),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'date': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+
+
+def compare(old: t.Dict[str, t.Any], new: t.Dict[str, t.Any]) -> None:
+    """Print the times of two saved runs side by side, with the ratio of the
+    new time to the old one.
+    """
+
+    for name, results in new['benchmarks'].items():
+        old_results = old['benchmarks'].get(name, {})
+        print(f'{name}:')
+
+        for label, ns in results.items():
+            if label in old_results:
+                ratio = ns / old_results[label]
+                print(
+                    f'  {label:<28} {old_results[label]:>14.1f} ns'
+                    f' {ns:>14.1f} ns {ratio:>7.2f}x'
+                )
+
+
+def main() -> None:
+    import argparse
+
+    argparser = argparse.ArgumentParser(prog='foxi.bench')
+    argparser.add_argument(
+        '-b',
+        '--backend',
+        type=str,
+        choices=ast.BACKENDS,
+        default='sympy',
+        help='representation of polynomial terms (default: sympy)',
+    )
+    argparser.add_argument(
+        '-r',
+        '--representation',
+        type=str,
+        choices=ast.REPRESENTATIONS,
+        default='tree',
+        help='representation of nested conditionals (default: tree)',
+    )
+    argparser.add_argument(
+        '-o',
+        '--output',
+        type=str,
+        default=None,
+        help='save the results as JSON to this file',
+    )
+    argparser.add_argument(
+        '-c',
+        '--compare',
+        type=str,
+        nargs=2,
+        metavar=('OLD', 'NEW'),
+        default=None,
+        help='compare the results saved in two files instead of running',
+    )
+    argparser.add_argument(
+        'benchmarks',
+        metavar='BENCHMARK',
+        nargs='*',
+        help='benchmarks to run: {} (default: all)'.format(
+            ', '.join(_BENCHMARKS)
+        ),
+    )
+
+    args = argparser.parse_args()
+
+    if args.compare is not None:
+        old, new = args.compare
+        with open(old) as f_old, open(new) as f_new:
+            compare(json.load(f_old), json.load(f_new))
+        sys.exit(0)
+
+    for name in args.benchmarks:
+        if name not in _BENCHMARKS:
+            argparser.error(f'unknown benchmark: {name}')
+
+    ast.set_backend(args.backend)
+    ast.set_representation(args.representation)
+    benchmarks = {}
+
+    for name in args.benchmarks or _BENCHMARKS:
+        print(f'{name}:')
+        benchmarks[name] = _BENCHMARKS[name]()
+        for label, ns in benchmarks[name].items():
+            print(f'  {label:<28} {ns:>14.1f} ns')
+
+    if args.output is not None:
+        with open(args.output, 'w') as f:
+            json.dump({**_metadata(), 'benchmarks': benchmarks}, f, indent=2)
+
+    sys.exit(0)
+
+
+if __name__ == '__main__':
+    main()
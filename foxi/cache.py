@@ -0,0 +1,92 @@
+# Copyright (c) 2019 Olmo Kramer <olmo.kramer@protonmail.com>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import collections
+import typing as t
+
+K = t.TypeVar('K')
+V = t.TypeVar('V')
+
+
+class CacheInfo(t.NamedTuple):
+    hits: int
+    misses: int
+    maxsize: t.Optional[int]
+    currsize: int
+
+
+class LRUCache(t.Generic[K, V]):
+    """Mapping with a bounded number of entries, which evicts the least
+    recently used entry when it is full.
+
+    A ``maxsize`` of ``None`` makes the cache unbounded, a ``maxsize`` of zero
+    disables it.
+    """
+
+    _entries: 'collections.OrderedDict[K, V]'
+    maxsize: t.Optional[int]
+    hits: int
+    misses: int
+
+    def __init__(self, maxsize: t.Optional[int] = 128) -> None:
+        self._entries = collections.OrderedDict()
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: K) -> t.Optional[V]:
+        try:
+            value = self._entries[key]
+        except KeyError:
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key: K, value: V) -> None:
+        if self.maxsize == 0:
+            return
+
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        self._evict()
+
+    def resize(self, maxsize: t.Optional[int]) -> None:
+        self.maxsize = maxsize
+
+        if maxsize == 0:
+            self._entries.clear()
+        else:
+            self._evict()
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def info(self) -> CacheInfo:
+        return CacheInfo(self.hits, self.misses, self.maxsize, len(self))
+
+    def _evict(self) -> None:
+        if self.maxsize is None:
+            return
+
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
@@ -0,0 +1,234 @@
+# Copyright (c) 2019 Olmo Kramer <olmo.kramer@protonmail.com>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Canonical form of equations.
+
+Equations that are the same up to renaming variables, swapping the sides, and
+reordering the operands of ``+`` and ``*`` have the same canonical form. The
+canonical form is the text of an equivalent equation, so it can be proven
+instead of the original, and serves as the key to deduplicate and cache
+proofs.
+
+Sums and products are flattened and their operands sorted, and subtractions
+become negated operands of a sum. The variables are renamed to ``x0``,
+``x1``, ... in the order of a signature that does not depend on their names:
+the contexts they occur in. Variables with the same signature are tried in
+every order, and the order that gives the smallest text wins, unless there
+are too many orders to try.
+"""
+
+import collections
+import itertools
+import math
+import re
+import typing as t
+
+from . import parser
+from .sympy_types import Symbol
+
+# Normalized syntax trees are tuples with the kind of the node first:
+# ('var', name), ('num', p, q), ('+', operands), ('*', operands), ('/', x, y)
+# and ('neg', x), where ('neg', x) only occurs as an operand of a sum.
+_Node = t.Tuple[t.Any, ...]
+_Names = t.Dict[str, str]
+
+# The maximum number of orders of the variables with the same signature to
+# render the equation with.
+_MAX_CANDIDATES = 720
+
+_NAME_RE = re.compile(r'[^\W\d_]\w*')
+
+
+class Canonical(t.NamedTuple):
+    """The canonical form ``text`` of an equation. ``names`` maps the
+    variables of the original equation to the variables in ``text``, and
+    ``flipped`` tells if the sides of the equation are swapped.
+    """
+
+    text: str
+    names: _Names
+    flipped: bool
+
+    def rename(self, text: str) -> str:
+        """Rename the variables of the original equation in ``text`` to the
+        names in the canonical form.
+        """
+
+        return _rename(text, self.names)
+
+    def restore(self, text: str) -> str:
+        """Rename the variables in ``text`` back to the original names.
+        """
+
+        return _rename(text, {v: k for k, v in self.names.items()})
+
+
+def _rename(text: str, names: _Names) -> str:
+    return _NAME_RE.sub(lambda m: names.get(m.group(), m.group()), text)
+
+
+def _operands(kind: str, node: _Node) -> t.Tuple[_Node, ...]:
+    return node[1] if node[0] == kind else (node,)
+
+
+def _negate(node: _Node) -> _Node:
+    if node[0] == 'neg':
+        return node[1]
+
+    if node[0] == '+':
+        return ('+', tuple(_negate(x) for x in node[1]))
+
+    return ('neg', node)
+
+
+def _normalize(tree: parser.SyntaxTree) -> _Node:
+    if isinstance(tree, Symbol):
+        return ('var', tree.name)
+
+    if not isinstance(tree, tuple):
+        return ('num', int(tree.p), int(tree.q))
+
+    op, x, y = tree
+
+    if op == '=':
+        raise parser.ParseError('Unexpected operator')
+
+    x = _normalize(x)
+    y = _normalize(y)
+
+    if op == '-':
+        op, y = '+', _negate(y)
+
+    if op in '+*':
+        return (op, _operands(op, x) + _operands(op, y))
+
+    return (op, x, y)
+
+
+def _render(node: _Node, names: _Names) -> str:
+    kind = node[0]
+
+    if kind == 'var':
+        return names[node[1]]
+
+    if kind == 'num':
+        _, p, q = node
+        return str(p) if q == 1 else f'({p} / {q})'
+
+    if kind == '/':
+        return f'{_wrap(node[1], names)} / {_wrap(node[2], names)}'
+
+    if kind == '*':
+        return ' * '.join(sorted(_wrap(x, names) for x in node[1]))
+
+    if kind == '+':
+        terms = sorted(_wrap(x, names) for x in node[1] if x[0] != 'neg')
+        negated = sorted(_wrap(x[1], names) for x in node[1] if x[0] == 'neg')
+        return ' - '.join([' + '.join(terms) or '0', *negated])
+
+    assert kind == 'neg'
+    return f'0 - {_wrap(node[1], names)}'
+
+
+def _wrap(node: _Node, names: _Names) -> str:
+    if node[0] in ('var', 'num'):
+        return _render(node, names)
+
+    return f'({_render(node, names)})'
+
+
+def _children(node: _Node) -> t.Iterator[t.Tuple[str, _Node]]:
+    kind = node[0]
+
+    if kind in ('+', '*'):
+        for x in node[1]:
+            yield '', x
+    elif kind == '/':
+        yield 'numerator', node[1]
+        yield 'denominator', node[2]
+    elif kind == 'neg':
+        yield 'neg', node[1]
+
+
+def _signatures(sides: t.Sequence[_Node]) -> t.Dict[str, t.Tuple[t.Any, ...]]:
+    """Get the signature of each variable: the sorted paths from the root to
+    its occurrences, where each step is the text of the node with all
+    variables anonymized and the position in that node.
+    """
+
+    anonymous: t.Dict[str, str] = collections.defaultdict(lambda: '_')
+    paths: t.Dict[str, t.List[t.Tuple[t.Any, ...]]]
+    paths = collections.defaultdict(list)
+
+    def visit(node: _Node, path: t.Tuple[t.Any, ...]) -> None:
+        if node[0] == 'var':
+            paths[node[1]].append(path)
+        elif node[0] != 'num':
+            text = _render(node, anonymous)
+            for position, x in _children(node):
+                visit(x, path + ((text, position),))
+
+    for side in sides:
+        visit(side, ())
+
+    return {v: tuple(sorted(p)) for v, p in paths.items()}
+
+
+def _candidates(sides: t.Sequence[_Node]) -> t.Iterator[_Names]:
+    signatures = _signatures(sides)
+
+    classes: t.Dict[t.Tuple[t.Any, ...], t.List[str]]
+    classes = collections.defaultdict(list)
+    for v in sorted(signatures):
+        classes[signatures[v]].append(v)
+
+    ordered = [classes[s] for s in sorted(classes)]
+    count = 1
+    for c in ordered:
+        count *= math.factorial(len(c))
+
+    if count > _MAX_CANDIDATES:
+        orders: t.Iterable[t.Tuple[t.Sequence[str], ...]]
+        orders = [tuple(ordered)]
+    else:
+        orders = itertools.product(*map(itertools.permutations, ordered))
+
+    for order in orders:
+        variables = itertools.chain.from_iterable(order)
+        yield {v: f'x{i}' for i, v in enumerate(variables)}
+
+
+def canonicalize(expr: str) -> t.Optional[Canonical]:
+    """Get the canonical form of the equation ``expr``, or ``None`` if it is
+    not an equation. Raises ``ParseError`` if ``expr`` can't be parsed.
+    """
+
+    tree = parser.syntax_tree(expr)
+
+    if not isinstance(tree, tuple) or tree[0] != '=':
+        return None
+
+    sides = (_normalize(tree[1]), _normalize(tree[2]))
+    best: t.Optional[Canonical] = None
+
+    for names in _candidates(sides):
+        lhs, rhs = (_render(side, names) for side in sides)
+        text = f'{min(lhs, rhs)} = {max(lhs, rhs)}'
+
+        if best is None or text < best.text:
+            best = Canonical(text, names, lhs > rhs)
+
+    assert best is not None
+    return best
@@ -0,0 +1,266 @@
+# Copyright (c) 2019 Olmo Kramer <olmo.kramer@protonmail.com>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Compilation of ``Algebraic`` expressions to Python functions.
+
+The function of an expression takes a mapping of the names of its variables
+to their values, and evaluates the expression at them with the semantics of
+meadows. An ``SMFN`` becomes an ``if`` statement on its condition, and an
+``SMF0`` a division that gives 0 if the denominator is 0, so only the
+polynomials on the path to the result are evaluated. The values should be
+elements of a field, like ``Fraction``s or ``float``s.
+
+An ``SMFN`` that occurs more than once in the expression is compiled to a
+function of its own, so the code grows linearly with the number of nodes, even
+for decision diagrams that share their subdiagrams.
+
+Use ``Algebraic.compiled``, which compiles the expression once and caches the
+function on the node. ``compile_tree`` compiles the syntax tree of an
+expression instead, for evaluating it many times before it is parsed.
+"""
+
+import collections
+import typing as t
+
+from fractions import Fraction
+
+from . import ast, debug, parser, sparse
+from .sympy_types import Add, Mul, Pow, Rational, Symbol, SympyExpr
+
+Function = t.Callable[[t.Mapping[str, t.Any]], t.Any]
+
+# Python limits the indentation depth of a block, so deeper ``SMFN``s are
+# compiled to functions of their own.
+_MAX_DEPTH = 32
+
+
+def _count_parents(expr: ast.Algebraic) -> t.Counter[ast.Algebraic]:
+    parents: t.Counter[ast.Algebraic] = collections.Counter()
+    stack = [expr]
+
+    while stack:
+        node = stack.pop()
+        if not isinstance(node, ast.SMFN):
+            continue
+
+        for child in (node.P, node.Q):
+            parents[child] += 1
+            if parents[child] == 1:
+                stack.append(child)
+
+    return parents
+
+
+class _Compiler:
+    def __init__(self, expr: ast.Algebraic) -> None:
+        names = sorted(str(v) for v in expr.free_variables)
+
+        self.variables = {name: f'v{i}' for i, name in enumerate(names)}
+        self.params = ', '.join(self.variables.values())
+        self.parents = _count_parents(expr)
+        self.namespace: t.Dict[str, t.Any] = {}
+        self.constants: t.Dict[Fraction, str] = {}
+        self.functions: t.Dict[ast.Algebraic, str] = {}
+        self.sources: t.List[str] = []
+        self.temporaries = 0
+
+    def constant(self, value: Fraction) -> str:
+        if value.denominator == 1:
+            return f'({value.numerator})'
+
+        name = self.constants.get(value)
+        if name is None:
+            name = self.constants[value] = f'c{len(self.constants)}'
+            self.namespace[name] = value
+
+        return name
+
+    def temporary(self) -> str:
+        self.temporaries += 1
+        return f't{self.temporaries}'
+
+    def sympy_terms(self, terms: SympyExpr) -> str:
+        if isinstance(terms, Symbol):
+            return self.variables[str(terms)]
+
+        if isinstance(terms, Add):
+            return '({})'.format(' + '.join(map(self.sympy_terms, terms.args)))
+
+        if isinstance(terms, Mul):
+            return '({})'.format(' * '.join(map(self.sympy_terms, terms.args)))
+
+        if isinstance(terms, Pow):
+            base, exp = terms.args
+            if isinstance(exp, Rational) and exp.q == 1 and exp.p > 0:
+                return f'{self.sympy_terms(base)} ** {exp.p}'
+
+        if isinstance(terms, Rational):
+            return self.constant(Fraction(int(terms.p), int(terms.q)))
+
+        raise ast.AlgebraError(f'Cannot compile {terms}')
+
+    def sparse_terms(self, terms: sparse.SparsePoly) -> str:
+        if not terms.terms:
+            return '(0)'
+
+        monomials = []
+
+        for monomial, coeff in terms.terms.items():
+            factors = [
+                self.variables[v] if e == 1 else f'{self.variables[v]} ** {e}'
+                for v, e in monomial
+            ]
+            if coeff != 1 or not factors:
+                factors.insert(0, self.constant(coeff))
+            monomials.append(' * '.join(factors))
+
+        return '({})'.format(' + '.join(monomials))
+
+    def polynomial(self, poly: ast.Polynomial) -> str:
+        if isinstance(poly.terms, sparse.SparsePoly):
+            return self.sparse_terms(poly.terms)
+
+        return self.sympy_terms(poly.terms)
+
+    def function(self, node: ast.SMFN) -> str:
+        name = self.functions.get(node)
+
+        if name is None:
+            name = self.functions[node] = f'f{len(self.functions)}'
+            lines: t.List[str] = []
+            ret = self.emit(node, lines, 1, root=True)
+            lines.insert(0, f'def {name}({self.params}):')
+            lines.append(f'    return {ret}')
+            self.sources.append('\n'.join(lines))
+
+        return f'{name}({self.params})'
+
+    def emit(
+        self,
+        node: ast.Algebraic,
+        lines: t.List[str],
+        depth: int,
+        root: bool = False,
+    ) -> str:
+        """Append the statements that evaluate ``node`` to ``lines``, indented
+        ``depth`` levels, and return an expression of its value.
+        """
+
+        indent = '    ' * depth
+
+        if isinstance(node, ast.Polynomial):
+            return self.polynomial(node)
+
+        if isinstance(node, ast.SMF0):
+            rhs = self.temporary()
+            lines.append(f'{indent}{rhs} = {self.polynomial(node.rhs)}')
+            return f'({self.polynomial(node.lhs)} / {rhs} if {rhs} else 0)'
+
+        assert isinstance(node, ast.SMFN)
+
+        if not root and (self.parents[node] > 1 or depth > _MAX_DEPTH):
+            return self.function(node)
+
+        ret = self.temporary()
+        lines.append(f'{indent}if {self.polynomial(node.cond)}:')
+        value = self.emit(node.P, lines, depth + 1)
+        lines.append(f'{indent}    {ret} = {value}')
+        lines.append(f'{indent}else:')
+        value = self.emit(node.Q, lines, depth + 1)
+        lines.append(f'{indent}    {ret} = {value}')
+
+        return ret
+
+
+def compile_function(expr: ast.Algebraic) -> Function:
+    """Compile ``expr`` to a Python function of a mapping of the names of its
+    variables to their values.
+    """
+
+    compiler = _Compiler(expr)
+    lines = [
+        f'    {v} = values[{name!r}]' for name, v in compiler.variables.items()
+    ]
+    ret = compiler.emit(expr, lines, 1, root=True)
+    lines.insert(0, 'def compiled(values):')
+    lines.append(f'    return {ret}')
+    compiler.sources.append('\n'.join(lines))
+
+    source = '\n\n'.join(compiler.sources)
+    debug.debug('Compiled {}:\n{}', expr, source)
+
+    exec(compile(source, '<foxi.codegen>', 'exec'), compiler.namespace)
+    return compiler.namespace['compiled']
+
+
+class _TreeCompiler:
+    def __init__(self) -> None:
+        self.namespace: t.Dict[str, t.Any] = {}
+        self.constants: t.Dict[Fraction, str] = {}
+        self.variables: t.Dict[Symbol, str] = {}
+        self.lines: t.List[str] = []
+
+    def constant(self, value: Fraction) -> str:
+        # Integer constants are Fractions too, so ``/`` stays exact.
+        name = self.constants.get(value)
+        if name is None:
+            name = self.constants[value] = f'c{len(self.constants)}'
+            self.namespace[name] = value
+
+        return name
+
+    def emit(self, tree: parser.SyntaxTree) -> str:
+        if isinstance(tree, Symbol):
+            name = self.variables.get(tree)
+            if name is None:
+                name = self.variables[tree] = f'v{len(self.variables)}'
+                self.lines.append(f'    {name} = values[{str(tree)!r}]')
+            return name
+
+        if not isinstance(tree, tuple):
+            return self.constant(Fraction(int(tree.p), int(tree.q)))
+
+        op, x, y = tree
+        x, y = self.emit(x), self.emit(y)
+        ret = f't{len(self.lines)}'
+
+        if op == '/':
+            zero = self.constant(Fraction(0))
+            self.lines.append(f'    {ret} = {x} / {y} if {y} else {zero}')
+        elif op in ('+', '-', '*'):
+            self.lines.append(f'    {ret} = {x} {op} {y}')
+        elif op == '=':
+            self.lines.append(f'    {ret} = {x}, {y}')
+        else:
+            raise parser.ParseError('Unexpected operator')
+
+        return ret
+
+
+def compile_tree(tree: parser.SyntaxTree) -> Function:
+    """Compile the syntax tree of an expression to a Python function of a
+    mapping of the names of its variables to their values, which must be
+    ``Fraction``s. The function of an equation returns the values of both
+    sides. Every node is evaluated in a statement of its own, so deep trees
+    compile too.
+    """
+
+    compiler = _TreeCompiler()
+    ret = compiler.emit(tree)
+    lines = ['def compiled(values):', *compiler.lines, f'    return {ret}']
+    source = '\n'.join(lines)
+
+    exec(compile(source, '<foxi.codegen>', 'exec'), compiler.namespace)
+    return compiler.namespace['compiled']
@@ -30,10 +30,32 @@ class DebugLevel(enum.IntEnum):
 _debug_level = DebugLevel.WARNING
 _indent_level = 0
 
+# Whether DEBUG messages are printed. Hot paths check this before doing any
+# work that is only needed for tracing, like keeping track of the indent.
+tracing = False
+
 
 def set_level(level: DebugLevel) -> None:
-    global _debug_level
+    """Set the lowest level of messages to print. The print functions of the
+    lower levels are replaced by a function that does nothing, so disabled
+    messages don't cost more than a call.
+    """
+
+    global _debug_level, tracing
+    global debug, info, warning, error, test
+
     _debug_level = level
+    tracing = level <= DebugLevel.DEBUG
+
+    debug = _debug if level <= DebugLevel.DEBUG else _noop
+    info = _info if level <= DebugLevel.INFO else _noop
+    warning = _warning if level <= DebugLevel.WARNING else _noop
+    error = _error if level <= DebugLevel.ERROR else _noop
+    test = _test if level <= DebugLevel.TEST else _noop
+
+
+def get_level() -> DebugLevel:
+    return _debug_level
 
 
 class indent(contextlib.ContextDecorator):
@@ -54,21 +76,34 @@ def printf(level: DebugLevel, fmt: str, *args: t.Any) -> None:
     print(fmt.format(*args))
 
 
-def debug(fmt: str, *args: t.Any) -> None:
+def _noop(fmt: str, *args: t.Any) -> None:
+    pass
+
+
+def _debug(fmt: str, *args: t.Any) -> None:
     printf(DebugLevel.DEBUG, fmt, *args)
 
 
-def info(fmt: str, *args: t.Any) -> None:
+def _info(fmt: str, *args: t.Any) -> None:
     printf(DebugLevel.INFO, fmt, *args)
 
 
-def warning(fmt: str, *args: t.Any) -> None:
+def _warning(fmt: str, *args: t.Any) -> None:
     printf(DebugLevel.WARNING, 'WARNING ' + fmt, *args)
 
 
-def error(fmt: str, *args: t.Any) -> None:
+def _error(fmt: str, *args: t.Any) -> None:
     printf(DebugLevel.ERROR, 'ERROR ' + fmt, *args)
 
 
-def test(fmt: str, *args: t.Any) -> None:
+def _test(fmt: str, *args: t.Any) -> None:
     printf(DebugLevel.TEST, fmt, *args)
+
+
+debug = _debug
+info = _info
+warning = _warning
+error = _error
+test = _test
+
+set_level(_debug_level)
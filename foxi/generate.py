@@ -0,0 +1,404 @@
+# Copyright (c) 2019 Olmo Kramer <olmo.kramer@protonmail.com>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Random equations for stress tests and benchmarks. Run with
+``python -m foxi.generate``.
+
+A TRUE equation equates a random expression to the result of rewriting it
+with the ring and meadow axioms of ``tests/axioms``. A FALSE equation is a
+TRUE one with one unsound rewrite, like ``x / x = 1``, applied to a side, if
+``refute`` certifies that the result is FALSE, and with a nonzero constant
+added to a side otherwise. The output is in the format of the ``--test``
+runner.
+
+The verdicts follow from the axioms, not from foxi, so a TRUE equation that
+fails its test points to a blind spot of the prover.
+"""
+
+import random
+import sys
+import typing as t
+
+# An expression is a variable or number, or a tuple of an operator and the
+# expressions of its operands.
+_Expr = t.Union[str, t.Tuple[str, t.Any, t.Any]]
+_Path = t.Tuple[int, ...]
+_Rule = t.Callable[[_Expr], t.Optional[_Expr]]
+
+_VERDICTS = ('TRUE', 'FALSE', 'mixed')
+
+# The number of random points to look for a counterexample to the result of an
+# unsound rewrite at.
+_REFUTE_POINTS = 256
+
+_NAMES = 'xyzabcdefghijklmnopqrstuvw'
+
+
+def _name(i: int) -> str:
+    return _NAMES[i] if i < len(_NAMES) else f'x{i}'
+
+
+def render(expr: _Expr) -> str:
+    if isinstance(expr, str):
+        return expr
+
+    op, x, y = expr
+    return f'{_wrap(x)} {op} {_wrap(y)}'
+
+
+def _wrap(expr: _Expr) -> str:
+    return expr if isinstance(expr, str) else f'({render(expr)})'
+
+
+def _has_variable(expr: _Expr) -> bool:
+    if isinstance(expr, str):
+        return not expr.isdigit()
+
+    return _has_variable(expr[1]) or _has_variable(expr[2])
+
+
+class _Generator:
+    def __init__(
+        self, rng: random.Random, variables: int, depth: int, division: float
+    ) -> None:
+        self.rng = rng
+        self.names = [_name(i) for i in range(variables)]
+        self.depth = depth
+        self.division = division
+
+        # The rules that need random expressions are methods. The order of
+        # the rules decides which one a seed picks.
+        self.sound: t.Sequence[_Rule] = (
+            _commute,
+            _associate,
+            _distribute,
+            self._identity,
+            self._inverse,
+            _subtract,
+            _reciprocal,
+            _regular,
+            _divide,
+        )
+        self.unsound: t.Sequence[_Rule] = (
+            _cancel,
+            _cancel_factor,
+            self._expand,
+        )
+
+    def leaf(self) -> _Expr:
+        if self.rng.random() < 0.8:
+            return self.rng.choice(self.names)
+
+        return str(self.rng.randint(0, 3))
+
+    def expr(self, depth: int) -> _Expr:
+        if depth == 0 or self.rng.random() < 0.2:
+            return self.leaf()
+
+        if self.rng.random() < self.division:
+            op = '/'
+        else:
+            op = self.rng.choice('+-*')
+
+        return (op, self.expr(depth - 1), self.expr(depth - 1))
+
+    def rewrite(self, expr: _Expr, rules: t.Sequence[_Rule]) -> _Expr:
+        """Apply one of ``rules`` to a random subexpression of ``expr``. The
+        expression is returned unchanged if no rule applies after a few
+        tries.
+        """
+
+        paths = list(_paths(expr))
+
+        for _ in range(20):
+            path = self.rng.choice(paths)
+            rule = self.rng.choice(rules)
+            ret = rule(_get(expr, path))
+
+            if ret is not None:
+                return _replace(expr, path, ret)
+
+        return expr
+
+    def _identity(self, e: _Expr) -> t.Optional[_Expr]:
+        return self.rng.choice([('+', '0', e), ('*', '1', e)])
+
+    def _inverse(self, e: _Expr) -> t.Optional[_Expr]:
+        # x + (0 - x) = 0 for any expression x.
+        x = self.expr(1)
+        return ('+', e, ('+', x, ('-', '0', x)))
+
+    def _expand(self, e: _Expr) -> t.Optional[_Expr]:
+        # x = (x * y) / y does not hold for y = 0.
+        y = self.rng.choice(self.names)
+        return ('/', ('*', e, y), y)
+
+
+def _paths(expr: _Expr, path: _Path = ()) -> t.Iterator[_Path]:
+    yield path
+
+    if not isinstance(expr, str):
+        yield from _paths(expr[1], path + (1,))
+        yield from _paths(expr[2], path + (2,))
+
+
+def _get(expr: _Expr, path: _Path) -> _Expr:
+    for i in path:
+        expr = expr[i]
+
+    return expr
+
+
+def _replace(expr: _Expr, path: _Path, new: _Expr) -> _Expr:
+    if not path:
+        return new
+
+    # Paths only continue below operators.
+    assert isinstance(expr, tuple)
+    op, x, y = expr
+    if path[0] == 1:
+        return (op, _replace(x, path[1:], new), y)
+    else:
+        return (op, x, _replace(y, path[1:], new))
+
+
+def _commute(e: _Expr) -> t.Optional[_Expr]:
+    if isinstance(e, tuple) and e[0] in '+*':
+        return (e[0], e[2], e[1])
+
+    return None
+
+
+def _associate(e: _Expr) -> t.Optional[_Expr]:
+    if not isinstance(e, tuple) or e[0] not in '+*':
+        return None
+
+    if isinstance(e[2], tuple) and e[2][0] == e[0]:
+        op, x, (_, y, z) = e
+        return (op, (op, x, y), z)
+
+    if isinstance(e[1], tuple) and e[1][0] == e[0]:
+        op, (_, x, y), z = e
+        return (op, x, (op, y, z))
+
+    return None
+
+
+def _distribute(e: _Expr) -> t.Optional[_Expr]:
+    if not isinstance(e, tuple) or e[0] != '*':
+        return None
+
+    if isinstance(e[2], tuple) and e[2][0] == '+':
+        _, x, (_, y, z) = e
+        return ('+', ('*', x, y), ('*', x, z))
+
+    if isinstance(e[1], tuple) and e[1][0] == '+':
+        _, (_, x, y), z = e
+        return ('+', ('*', x, z), ('*', y, z))
+
+    return None
+
+
+def _subtract(e: _Expr) -> t.Optional[_Expr]:
+    if isinstance(e, tuple) and e[0] == '-':
+        return ('+', e[1], ('-', '0', e[2]))
+
+    return None
+
+
+def _reciprocal(e: _Expr) -> t.Optional[_Expr]:
+    return ('/', '1', ('/', '1', e))
+
+
+def _regular(e: _Expr) -> t.Optional[_Expr]:
+    return ('*', ('/', e, e), e)
+
+
+def _divide(e: _Expr) -> t.Optional[_Expr]:
+    if isinstance(e, tuple) and e[0] == '/' and e[1] != '1':
+        return ('*', e[1], ('/', '1', e[2]))
+
+    return None
+
+
+def _cancel(e: _Expr) -> t.Optional[_Expr]:
+    # x / x = 1 does not hold for x = 0.
+    if (
+        isinstance(e, tuple)
+        and e[0] == '/'
+        and e[1] == e[2]
+        and _has_variable(e[1])
+    ):
+        return '1'
+
+    return None
+
+
+def _cancel_factor(e: _Expr) -> t.Optional[_Expr]:
+    # x / y = x does not hold for y = 0, unless x = 0.
+    if isinstance(e, tuple) and e[0] == '/' and _has_variable(e[2]):
+        return e[1]
+
+    return None
+
+
+def generate(
+    count: int,
+    variables: int = 3,
+    depth: int = 3,
+    division: float = 0.3,
+    rewrites: int = 4,
+    verdict: str = 'mixed',
+    verify: bool = True,
+    seed: t.Optional[int] = None,
+) -> t.Iterator[t.Tuple[str, str]]:
+    """Generate ``count`` equations with their expected verdicts.
+
+    The expressions are trees of at most ``depth`` operators deep over
+    ``variables`` variables, in which an operator is a division with
+    probability ``division``. A side of a TRUE equation is rewritten with
+    ``rewrites`` axioms. ``verdict`` is ``'TRUE'``, ``'FALSE'`` or
+    ``'mixed'`` for both at random.
+
+    An unsound rewrite can still give a TRUE equation, for example if it is
+    applied to a subexpression that is multiplied by zero, so a FALSE
+    equation is only kept if ``refute`` finds a point at which its sides
+    differ. The others get a constant added to a side instead, which is
+    always FALSE. If ``verify`` is not set, all FALSE equations are made that
+    way.
+    """
+
+    if verdict not in _VERDICTS:
+        raise ValueError(f'Unknown verdict: {verdict}')
+
+    gen = _Generator(random.Random(seed), variables, depth, division)
+
+    for _ in range(count):
+        lhs = gen.expr(depth)
+        rhs = lhs
+
+        for _ in range(rewrites):
+            rhs = gen.rewrite(rhs, gen.sound)
+
+        expect = verdict
+        if expect == 'mixed':
+            expect = gen.rng.choice(('TRUE', 'FALSE'))
+
+        if expect == 'FALSE':
+            false_rhs = rhs
+            if verify:
+                false_rhs = gen.rewrite(rhs, gen.unsound)
+
+            if false_rhs is rhs or not _refuted(lhs, false_rhs):
+                false_rhs = ('+', rhs, str(gen.rng.randint(1, 3)))
+
+            rhs = false_rhs
+
+        yield expect, f'{render(lhs)} = {render(rhs)}'
+
+
+def _refuted(lhs: _Expr, rhs: _Expr) -> bool:
+    from . import parser, refute
+
+    text = f'{render(lhs)} = {render(rhs)}'
+    tree = parser.syntax_tree(text)
+    return refute.refute(tree, _REFUTE_POINTS, seed=text) is not None
+
+
+def main() -> None:
+    import argparse
+
+    argparser = argparse.ArgumentParser(prog='foxi.generate')
+    argparser.add_argument(
+        '-n',
+        '--count',
+        type=int,
+        default=10,
+        help='number of equations (default: 10)',
+    )
+    argparser.add_argument(
+        '-v',
+        '--variables',
+        type=int,
+        default=3,
+        help='number of variables (default: 3)',
+    )
+    argparser.add_argument(
+        '-d',
+        '--depth',
+        type=int,
+        default=3,
+        help='maximum depth of the operators of a side (default: 3)',
+    )
+    argparser.add_argument(
+        '--division',
+        type=float,
+        default=0.3,
+        help='probability that an operator is a division (default: 0.3)',
+    )
+    argparser.add_argument(
+        '-r',
+        '--rewrites',
+        type=int,
+        default=4,
+        help='number of axioms to rewrite a side with (default: 4)',
+    )
+    argparser.add_argument(
+        '--verdict',
+        type=str,
+        choices=_VERDICTS,
+        default='mixed',
+        help='verdict of the equations (default: mixed)',
+    )
+    argparser.add_argument(
+        '--no-verify',
+        action='store_false',
+        dest='verify',
+        default=True,
+        help=(
+            'don\'t refute the FALSE equations while generating them, but'
+            ' only add a constant to a side'
+        ),
+    )
+    argparser.add_argument(
+        '-s', '--seed', type=int, default=None, help='random seed'
+    )
+    argparser.add_argument(
+        '-p',
+        '--plain',
+        action='store_true',
+        default=False,
+        help='don\'t prefix the equations with their verdicts',
+    )
+
+    args = argparser.parse_args()
+
+    for expect, expr in generate(
+        args.count,
+        variables=args.variables,
+        depth=args.depth,
+        division=args.division,
+        rewrites=args.rewrites,
+        verdict=args.verdict,
+        verify=args.verify,
+        seed=args.seed,
+    ):
+        print(expr if args.plain else f'{expect} {expr}')
+
+    sys.exit(0)
+
+
+if __name__ == '__main__':
+    main()
@@ -15,15 +15,24 @@
 
 import collections
 import enum
+import functools
+import re
 import typing as t
 
 from dataclasses import dataclass
 
-from . import ast, debug
+from . import ast, cache, debug, stats
+from .sympy_types import Rational, Symbol
 
-_ExprStack = t.Deque['ast.Expression']
+_ExprStack = t.Deque[t.Any]
 _OpStack = t.Deque[t.Union['_Paren', '_Operator']]
 _Token = t.Union['_Paren', '_Operator', 'ast.Polynomial']
+_Lexeme = t.Union['_Paren', '_Operator', Symbol, Rational]
+_Apply = t.Callable[['_Operator', t.List[t.Any]], t.Any]
+
+# A syntax tree is a symbol, a number, or a tuple of an operator and the
+# syntax trees of its operands.
+SyntaxTree = t.Union[Symbol, Rational, t.Tuple[t.Any, ...]]
 
 
 class ParseError(Exception):
@@ -81,83 +90,82 @@ class _Paren(enum.IntEnum):
     RIGHT = enum.auto()
 
 
-def _skip_spaces(expr: str, i: int) -> int:
-    l = len(expr)
-
-    while i < l and expr[i].isspace():
-        i += 1
-
-    return i
-
-
-def _read_symbol(expr: str, i: int) -> t.Tuple[int, ast.Polynomial]:
-    l = len(expr)
-    j = i
-
-    while j < l:
-        c = expr[j]
-
-        if c.isalnum() or c == '_':
-            j += 1
-        else:
-            break
-
-    return j, ast.Polynomial(expr[i:j])
-
+_CHARS: t.Dict[str, t.Union[_Paren, _Operator]] = {
+    '(': _Paren.LEFT,
+    ')': _Paren.RIGHT,
+    **_OPERATORS,
+}
 
-def _read_number(expr: str, i: int) -> t.Tuple[int, ast.Polynomial]:
-    l = len(expr)
-    j = i
 
-    while j < l and expr[j].isdigit():
-        j += 1
+# Whitespace, followed by a number, a symbol, an operator or a parenthesis.
+_TOKEN_RE = re.compile(
+    r'''
+    \s*
+    (?:
+        (?P<number>\d+(?:\.\d*)?)
+      | (?P<symbol>[^\W\d_]\w*)
+      | (?P<char>[()=+\-*/])
+      | (?P<end>$)
+    )
+    ''',
+    re.VERBOSE,
+)
 
-    if j < l and expr[j] == '.':
-        j += 1
 
-    while j < l and expr[j].isdigit():
-        j += 1
+@functools.lru_cache(maxsize=4096)
+def _symbol(name: str) -> Symbol:
+    return Symbol(name)
 
-    return j, ast.Polynomial(expr[i:j])
 
+@functools.lru_cache(maxsize=4096)
+def _number(text: str) -> Rational:
+    return Rational(text)
 
-def _read_token(expr: str, i: int) -> t.Tuple[int, _Token]:
-    c = expr[i]
 
-    if c == '(':
-        return i + 1, _Paren.LEFT
+def _lex(expr: str) -> t.Iterator[_Lexeme]:
+    """Split ``expr`` into tokens in a single pass of a compiled regex.
+    Symbols and numbers are created directly as sympy ``Symbol``s and exact
+    ``Rational``s, which are shared by all tokens with the same text.
+    """
 
-    if c == ')':
-        return i + 1, _Paren.RIGHT
+    i = 0
 
-    if c in _OPERATORS:
-        return i + 1, _OPERATORS[c]
+    while True:
+        match = _TOKEN_RE.match(expr, i)
 
-    if c.isalpha():
-        return _read_symbol(expr, i)
+        if match is None:
+            raise ParseError(f'Unexpected character: {expr[i:].lstrip()[0]}')
 
-    if c.isdigit():
-        return _read_number(expr, i)
+        # Every alternative of the regex is a named group.
+        kind = match.lastgroup
+        assert kind is not None
+        text = match.group(kind)
+        i = match.end()
 
-    raise ParenError()
+        if kind == 'number':
+            yield _number(text)
+        elif kind == 'symbol':
+            yield _symbol(text)
+        elif kind == 'char':
+            yield _CHARS[text]
+        else:
+            return
 
 
 def tokenize(expr: str) -> t.Iterator[_Token]:
-    l = len(expr)
-    i = 0
+    """Split ``expr`` into operators, parentheses and ``Polynomial``s.
+    """
 
-    while i < l:
-        i = _skip_spaces(expr, i)
-
-        if i >= len(expr):
-            return
-
-        i, token = _read_token(expr, i)
-
-        yield token
+    for token in _lex(expr):
+        if isinstance(token, (_Paren, _Operator)):
+            yield token
+        else:
+            yield ast.Polynomial(token)
 
 
-def _pop_operator(expr_stack: _ExprStack, op_stack: _OpStack) -> None:
+def _pop_operator(
+    expr_stack: _ExprStack, op_stack: _OpStack, apply: _Apply
+) -> None:
     operator = op_stack.pop()
 
     if not isinstance(operator, _Operator):
@@ -168,23 +176,28 @@ def _pop_operator(expr_stack: _ExprStack, op_stack: _OpStack) -> None:
     except IndexError:
         raise ParseError(f'Unexpected operator')
 
-    expr_stack.append(operator.eval(*args))
+    expr_stack.append(apply(operator, list(args)))
 
 
 def _pop_until_lower_precedence(
-    expr_stack: _ExprStack, op_stack: _OpStack, operator: _Operator
+    expr_stack: _ExprStack,
+    op_stack: _OpStack,
+    operator: _Operator,
+    apply: _Apply,
 ) -> None:
     while (
         op_stack
         and not isinstance(op_stack[-1], _Paren)
         and op_stack[-1] < operator
     ):
-        _pop_operator(expr_stack, op_stack)
+        _pop_operator(expr_stack, op_stack, apply)
 
 
-def _pop_until_left_paren(expr_stack: _ExprStack, op_stack: _OpStack) -> None:
+def _pop_until_left_paren(
+    expr_stack: _ExprStack, op_stack: _OpStack, apply: _Apply
+) -> None:
     while op_stack and op_stack[-1] != _Paren.LEFT:
-        _pop_operator(expr_stack, op_stack)
+        _pop_operator(expr_stack, op_stack, apply)
 
     if not op_stack:
         raise ParenError()
@@ -192,38 +205,115 @@ def _pop_until_left_paren(expr_stack: _ExprStack, op_stack: _OpStack) -> None:
     op_stack.pop()
 
 
+_parse_cache: 'cache.LRUCache[t.Tuple[str, str, str], ast.Expression]'
+_parse_cache = cache.LRUCache(maxsize=1024)
+
+
+def set_parse_cache_size(maxsize: t.Optional[int]) -> None:
+    """Set the maximum number of parsed expressions to remember. ``None``
+    makes the cache unbounded, zero disables it.
+    """
+
+    _parse_cache.resize(maxsize)
+
+
+def parse_cache_info() -> cache.CacheInfo:
+    return _parse_cache.info()
+
+
+def clear_parse_cache() -> None:
+    _parse_cache.clear()
+
+
 def parse(expr: str) -> ast.Expression:
+    """Parse ``expr`` into an ``Expression``.
+
+    The results are cached by the text of the expression with its whitespace
+    normalized. Expressions are immutable, so the cached trees are shared by
+    all callers.
+    """
+
+    key = (ast.get_backend(), ast.get_representation(), ' '.join(expr.split()))
+    parsed = _parse_cache.get(key)
+
+    if parsed is None:
+        parsed = _parse(expr)
+        _parse_cache.put(key, parsed)
+    elif stats.enabled:
+        stats.count('parse cache hits')
+
+    return parsed
+
+
+def syntax_tree(expr: str) -> SyntaxTree:
+    """Parse ``expr`` into its ``SyntaxTree``, without evaluating the
+    operators.
+    """
+
+    return _shunting_yard(_lex(expr), lambda op, args: (op.repr, *args))
+
+
+def from_syntax_tree(tree: SyntaxTree) -> ast.Expression:
+    """Build the ``Expression`` of a ``SyntaxTree`` by applying its operators.
+    """
+
+    if not isinstance(tree, tuple):
+        return ast.Polynomial(tree)
+
+    op, *args = tree
+    return _OPERATORS[op].eval(*map(from_syntax_tree, args))
+
+
+def _parse(expr: str) -> ast.Expression:
+    return _shunting_yard(tokenize(expr), lambda op, args: op.eval(*args))
+
+
+def _shunting_yard(tokens: t.Iterable[t.Any], apply: _Apply) -> t.Any:
     expr_stack: _ExprStack
     op_stack: _OpStack
 
     expr_stack = collections.deque()
     op_stack = collections.deque()
+    equation = False
 
-    for token in tokenize(expr):
-        if isinstance(token, ast.Polynomial):
-            expr_stack.append(token)
+    def apply_operator(operator: _Operator, args: t.List[t.Any]) -> t.Any:
+        nonlocal equation
+
+        # An equation can only be the whole expression.
+        if equation:
+            raise ParseError('Unexpected =')
 
-        elif isinstance(token, _Operator):
-            _pop_until_lower_precedence(expr_stack, op_stack, token)
+        equation = operator is _OPERATORS['=']
+        return apply(operator, args)
+
+    for token in tokens:
+        if isinstance(token, _Operator):
+            _pop_until_lower_precedence(
+                expr_stack, op_stack, token, apply_operator
+            )
             op_stack.append(token)
 
-        elif token == _Paren.LEFT:
+        elif token is _Paren.LEFT:
             op_stack.append(token)
 
-        elif token == _Paren.RIGHT:
-            _pop_until_left_paren(expr_stack, op_stack)
+        elif token is _Paren.RIGHT:
+            _pop_until_left_paren(expr_stack, op_stack, apply_operator)
 
         else:
-            raise ParseError(f'Unknown token: {token}')
+            expr_stack.append(token)
 
         debug.debug('Expression stack: {}', expr_stack)
         debug.debug('Operator stack:   {}', op_stack)
 
     while op_stack:
-        _pop_operator(expr_stack, op_stack)
+        _pop_operator(expr_stack, op_stack, apply_operator)
         debug.debug('Expression stack: {}', expr_stack)
         debug.debug('Operator stack:   {}', op_stack)
 
-    assert len(expr_stack) == 1 and len(op_stack) == 0
+    if not expr_stack:
+        raise ParseError('Empty expression')
+
+    if len(expr_stack) > 1:
+        raise ParseError('Missing operator')
 
     return expr_stack[0]
@@ -0,0 +1,280 @@
+# Copyright (c) 2019 Olmo Kramer <olmo.kramer@protonmail.com>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import time
+import typing as t
+
+from dataclasses import dataclass
+
+from . import ast, canonical, debug, parser, refute, stats, store
+
+
+@dataclass
+class Result:
+    """Outcome of proving an expression.
+
+    ``verdict`` is ``'TRUE'`` or ``'FALSE'`` for an equation, ``'ERROR'`` if
+    the expression can't be parsed, and ``'EXPRESSION'`` if it is not an
+    equation. The command line reports expressions that take too long as
+    ``'TIMEOUT'``. ``residual`` is the evaluated difference of the sides of
+    the equation, or the expression itself if it is not an equation.
+    ``counterexample`` maps the variables to ``'zero'`` or ``'nonzero'`` in
+    the first assignment in which a FALSE equation does not hold, or to their
+    values if the equation was refuted at a random point, in which case
+    ``residual`` is the difference of the values of the sides. ``cached``
+    tells if the result came from the persistent proof cache. ``stats`` holds
+    the counters and timers of the proof if ``stats`` are enabled.
+    """
+
+    expression: str
+    verdict: str
+    residual: t.Optional[str] = None
+    counterexample: t.Optional[t.Dict[str, str]] = None
+    elapsed: float = 0.0
+    error: t.Optional[str] = None
+    cached: bool = False
+    stats: t.Optional[t.Dict[str, t.Any]] = None
+
+    @property
+    def proven(self) -> t.Optional[bool]:
+        return {'TRUE': True, 'FALSE': False}.get(self.verdict)
+
+
+_Input = t.Union[str, ast.Expression]
+
+_proof_cache: t.Optional[store.ProofCache] = None
+
+
+def set_proof_cache(proof_cache: t.Optional[store.ProofCache]) -> None:
+    """Set the persistent cache that ``prove`` consults before parsing an
+    expression, and stores the proofs of equations in.
+    """
+
+    global _proof_cache
+    _proof_cache = proof_cache
+
+
+def get_proof_cache() -> t.Optional[store.ProofCache]:
+    return _proof_cache
+
+
+def prove(expr: _Input) -> Result:
+    """Prove a single expression, given as a string or as a parsed
+    ``Expression``.
+
+    If a proof cache is set, the proof of an equation given as a string is
+    stored under its canonical form, so equations that only differ in the
+    names of their variables, the order of their sides or the order of the
+    operands of ``+`` and ``*`` share their proof. The counterexample of a
+    shared proof is given in the names of the variables of ``expr``, and its
+    residual is only given if the sides are in the same order.
+    """
+
+    return _prove(expr, None)
+
+
+def _parse(text: str) -> ast.Expression:
+    if stats.enabled:
+        with stats.timer('parse'):
+            return parser.parse(text)
+
+    return parser.parse(text)
+
+
+def _evaluate(parsed: ast.Equation) -> store.Entry:
+    eval, counterexample = parsed.find_counterexample()
+
+    names = None
+    if counterexample is not None:
+        names = {str(v): c for v, c in counterexample.items()}
+
+    return store.Entry('TRUE' if eval.is_zero else 'FALSE', repr(eval), names)
+
+
+def _refute(expr: _Input) -> t.Optional[store.Entry]:
+    """Try to refute ``expr`` at random points before it is parsed into an
+    ``Expression``. Returns ``None`` if it is not refuted, or if it is not an
+    equation.
+    """
+
+    if not refute.get_points() or not isinstance(expr, str):
+        return None
+
+    try:
+        tree = parser.syntax_tree(expr)
+        if not isinstance(tree, tuple) or tree[0] != '=':
+            return None
+
+        if stats.enabled:
+            with stats.timer('refute'):
+                refutation = refute.refute(tree, refute.get_points(), expr)
+        else:
+            refutation = refute.refute(tree, refute.get_points(), expr)
+    except parser.ParseError:
+        # Let the parser report the error.
+        return None
+
+    if refutation is None:
+        return None
+
+    debug.info('Counterexample: {}', refutation.point)
+
+    return store.Entry(
+        'FALSE',
+        str(refutation.lhs - refutation.rhs),
+        {v: str(x) for v, x in refutation.point.items()},
+    )
+
+
+def _rename(
+    entry: store.Entry, rename: t.Callable[[str], str], flipped: bool
+) -> store.Entry:
+    """Rename the variables of ``entry`` with ``rename``. Swapping the sides
+    of an equation negates its residual, so it is dropped if ``flipped``.
+    """
+
+    residual = entry.residual
+    if residual is not None:
+        residual = None if flipped else rename(residual)
+
+    counterexample = entry.counterexample
+    if counterexample is not None:
+        counterexample = {rename(v): c for v, c in counterexample.items()}
+
+    return store.Entry(entry.verdict, residual, counterexample)
+
+
+def _canonicalize(expr: _Input) -> t.Optional[canonical.Canonical]:
+    if not isinstance(expr, str):
+        return None
+
+    try:
+        return canonical.canonicalize(expr)
+    except parser.ParseError:
+        # Let the parser report the error of the original expression.
+        return None
+
+
+def _prove(
+    expr: _Input, proven: t.Optional[t.Dict[str, store.Entry]]
+) -> Result:
+    """Prove ``expr``. The proofs of equations are looked up and stored by
+    their canonical form if there is a proof cache, or if ``proven`` maps
+    canonical forms to their proofs.
+    """
+
+    if not stats.enabled:
+        return _prove_expr(expr, proven)
+
+    with stats.collect() as collected:
+        ret = _prove_expr(expr, proven)
+
+    ret.stats = collected.as_dict()
+    return ret
+
+
+def _prove_expr(
+    expr: _Input, proven: t.Optional[t.Dict[str, store.Entry]]
+) -> Result:
+    start = time.perf_counter()
+    text = expr if isinstance(expr, str) else repr(expr)
+
+    def result(verdict: str, **kwargs: t.Any) -> Result:
+        elapsed = time.perf_counter() - start
+        return Result(text, verdict, elapsed=elapsed, **kwargs)
+
+    canon = None
+    entry = None
+
+    if _proof_cache is not None or proven is not None:
+        canon = _canonicalize(expr)
+
+    if canon is not None:
+        if proven is not None:
+            entry = proven.get(canon.text)
+
+        if entry is None and _proof_cache is not None:
+            entry = _proof_cache.get(canon.text)
+
+    cached = entry is not None
+
+    if cached and stats.enabled:
+        stats.count('proof cache hits')
+
+    if entry is not None:
+        assert canon is not None
+        entry = _rename(entry, canon.restore, canon.flipped)
+    else:
+        # The prover may answer differently for equivalent equations, so
+        # the canonical form is only used as the key of the proof.
+        entry = _refute(expr)
+
+    if entry is None:
+        try:
+            if isinstance(expr, ast.Expression):
+                parsed = expr
+            else:
+                parsed = _parse(expr)
+        except (ast.AlgebraError, parser.ParseError) as e:
+            debug.error('{}', e)
+            return result('ERROR', error=str(e))
+
+        if isinstance(parsed, ast.Algebraic):
+            debug.info('{}', parsed)
+            return result('EXPRESSION', residual=repr(parsed))
+
+        assert isinstance(parsed, ast.Equation)
+
+        if stats.enabled:
+            with stats.timer('search'):
+                entry = _evaluate(parsed)
+        else:
+            entry = _evaluate(parsed)
+
+    if not cached and canon is not None:
+        canonical_entry = _rename(entry, canon.rename, canon.flipped)
+
+        if proven is not None:
+            proven[canon.text] = canonical_entry
+
+        if _proof_cache is not None:
+            _proof_cache.put(canon.text, *canonical_entry)
+
+    debug.info(
+        'Proven to be {}{}: {}',
+        entry.verdict,
+        ' (cached)' if cached else '',
+        text,
+    )
+
+    if entry.verdict == 'FALSE':
+        debug.info('Resulting expression: {} = 0', entry.residual)
+
+    return result(cached=cached, **entry._asdict())
+
+
+def prove_many(exprs: t.Iterable[_Input]) -> t.Iterator[Result]:
+    """Prove each of ``exprs``, yielding the results lazily in input order.
+
+    The parse, factorization and operation caches are process-wide, so the
+    batch shares them, and equations with the same canonical form are only
+    proven once. Each equation has an ``ast.evaluation_memo`` scope of its
+    own, which ``Equation.find_counterexample`` opens and closes.
+    """
+
+    proven: t.Dict[str, store.Entry] = {}
+
+    for expr in exprs:
+        yield _prove(expr, proven)
@@ -0,0 +1,205 @@
+# Copyright (c) 2019 Olmo Kramer <olmo.kramer@protonmail.com>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Refutation of equations at random points.
+
+Most false equations already fail at a random point, which is much cheaper to
+find than the case split of ``Equation.find_counterexample``. ``refute``
+evaluates the sides of an equation at random points in the integers modulo a
+large prime, which form a meadow with the inverse of 0 being 0. Each
+variable is zero in about a quarter of the points, since many equations of
+meadows only fail there.
+
+A point at which the sides differ modulo the prime is evaluated again with
+exact rational arithmetic, so a refutation is a certified counterexample. The
+points are evaluated all at once with NumPy if it is installed, as with the
+``fast`` extra of the package, and one at a time with exact arithmetic
+otherwise. The exact evaluation uses the sides compiled with
+``codegen.compile_tree``.
+"""
+
+import random
+import types
+import typing as t
+
+from fractions import Fraction
+
+from . import codegen, parser, stats
+from .sympy_types import Symbol
+
+numpy: t.Optional[types.ModuleType] = None
+try:
+    import numpy  # type: ignore
+except ModuleNotFoundError:
+    pass
+
+# The largest prime below 2**31, so the product of two residues fits in the
+# int64 arrays of NumPy.
+_PRIME = 2 ** 31 - 1
+
+_ZERO_PROBABILITY = 0.25
+_MAX_VALUE = 2 ** 20
+
+# The number of random points to evaluate an equation at before proving it.
+_points = 0
+
+_Point = t.Dict[Symbol, int]
+
+
+class Refutation(t.NamedTuple):
+    """A ``point`` at which the sides of an equation evaluate to the
+    different rationals ``lhs`` and ``rhs``.
+    """
+
+    point: t.Dict[str, int]
+    lhs: Fraction
+    rhs: Fraction
+
+
+def set_points(points: int) -> None:
+    """Set the number of random points that ``prove`` tries to refute an
+    equation at before proving it. Zero disables the refutation.
+    """
+
+    global _points
+    _points = points
+
+
+def get_points() -> int:
+    return _points
+
+
+def _variables(tree: parser.SyntaxTree) -> t.Set[Symbol]:
+    if isinstance(tree, Symbol):
+        return {tree}
+
+    if not isinstance(tree, tuple):
+        return set()
+
+    return set().union(*map(_variables, tree[1:]))
+
+
+def _inverse(a: t.Any) -> t.Any:
+    """Get the inverses of the residues in the array ``a``, as ``a`` to the
+    power ``_PRIME - 2``. The inverse of 0 is 0.
+    """
+
+    assert numpy is not None
+    ret = numpy.ones_like(a)
+    e = _PRIME - 2
+
+    while e:
+        if e & 1:
+            ret = ret * a % _PRIME
+        a = a * a % _PRIME
+        e >>= 1
+
+    return ret
+
+
+def _evaluate_batch(
+    tree: parser.SyntaxTree, values: t.Dict[Symbol, t.Any], n: int
+) -> t.Any:
+    if isinstance(tree, Symbol):
+        return values[tree]
+
+    if not isinstance(tree, tuple):
+        assert numpy is not None
+        p = numpy.full(n, int(tree.p) % _PRIME, dtype=numpy.int64)
+        q = numpy.full(n, int(tree.q) % _PRIME, dtype=numpy.int64)
+        return p * _inverse(q) % _PRIME
+
+    op, x, y = tree
+    x = _evaluate_batch(x, values, n)
+    y = _evaluate_batch(y, values, n)
+
+    if op == '+':
+        return (x + y) % _PRIME
+    elif op == '-':
+        return (x - y) % _PRIME
+    elif op == '*':
+        return x * y % _PRIME
+    elif op == '/':
+        return x * _inverse(y) % _PRIME
+
+    raise parser.ParseError('Unexpected operator')
+
+
+def _candidates(
+    lhs: parser.SyntaxTree, rhs: parser.SyntaxTree, points: t.List[_Point]
+) -> t.List[_Point]:
+    """Get the points at which the sides may differ: the ones at which they
+    differ modulo the prime, or all of them without NumPy.
+    """
+
+    if numpy is None or not points:
+        return points
+
+    values = {
+        v: numpy.array([p[v] % _PRIME for p in points], dtype=numpy.int64)
+        for v in points[0]
+    }
+    differ = _evaluate_batch(lhs, values, len(points)) != _evaluate_batch(
+        rhs, values, len(points)
+    )
+
+    return [points[i] for i in numpy.flatnonzero(differ)]
+
+
+def _random_point(rng: random.Random, variables: t.Iterable[Symbol]) -> _Point:
+    return {
+        v: 0
+        if rng.random() < _ZERO_PROBABILITY
+        else rng.choice((-1, 1)) * rng.randint(1, _MAX_VALUE)
+        for v in variables
+    }
+
+
+def refute(
+    tree: parser.SyntaxTree, points: int, seed: t.Any = None
+) -> t.Optional[Refutation]:
+    """Evaluate the sides of the equation ``tree`` at ``points`` random
+    points, seeded with ``seed``. Returns the first point at which they
+    differ, or ``None`` if there is none.
+    """
+
+    assert isinstance(tree, tuple) and tree[0] == '='
+    _, lhs, rhs = tree
+
+    rng = random.Random(seed)
+    variables = sorted(_variables(tree), key=str)
+    batch = [_random_point(rng, variables) for _ in range(points)]
+
+    candidates = _candidates(lhs, rhs, batch)
+    if not candidates:
+        return None
+
+    # Compile the equation only if there are points to check exactly.
+    evaluate = codegen.compile_tree(tree)
+
+    for point in candidates:
+        lhs_value, rhs_value = evaluate(
+            {str(v): Fraction(x) for v, x in point.items()}
+        )
+
+        if lhs_value != rhs_value:
+            if stats.enabled:
+                stats.count('refutations')
+
+            return Refutation(
+                {str(v): x for v, x in point.items()}, lhs_value, rhs_value
+            )
+
+    return None
@@ -0,0 +1,294 @@
+# Copyright (c) 2019 Olmo Kramer <olmo.kramer@protonmail.com>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Enumeration of the zero/nonzero assignments of an ``Equation``.
+
+Assignment ``i`` makes variable ``k`` nonzero if bit ``k`` of ``i`` is set,
+and zero otherwise. The assignments are checked in increasing order, and the
+first one in which the difference of the two sides does not evaluate to zero
+is the counterexample.
+
+The search branches on the variables from the last to the first, so the
+assignments that share the values of the last variables form a subtree. The
+difference is simplified with ``Algebraic.assign`` along the way, and a
+subtree in which it no longer contains the variables that are left is
+checked with a single evaluation.
+
+The parallel search splits the assignments into consecutive ranges and always
+reports the counterexample with the lowest index, so it finds the same
+counterexample as the sequential search.
+"""
+
+import concurrent.futures
+import multiprocessing
+import typing as t
+
+from . import ast, debug, stats
+from .sympy_types import Symbol, SympyExpr
+
+_Failure = t.Tuple[int, 'ast.Algebraic']
+
+_jobs = 1
+
+# State of a worker process in the parallel search, set by ``_init_worker``.
+_bound: t.Any = None
+_diff: 'ast.Algebraic'
+_variables: t.Sequence[Symbol]
+_zeros: t.AbstractSet[SympyExpr]
+_nonzeros: t.AbstractSet[SympyExpr]
+
+
+def set_jobs(jobs: int) -> None:
+    """Set the number of processes to search the assignments of a single
+    equation with.
+    """
+
+    global _jobs
+    _jobs = jobs
+
+
+def get_jobs() -> int:
+    return _jobs
+
+
+def assignment(
+    variables: t.Sequence[Symbol], i: int
+) -> t.Tuple[t.FrozenSet[Symbol], t.FrozenSet[Symbol]]:
+    """Get the zeros and the nonzeros of assignment ``i``.
+    """
+
+    zeros = frozenset(v for k, v in enumerate(variables) if not i & (1 << k))
+    nonzeros = frozenset(v for k, v in enumerate(variables) if i & (1 << k))
+
+    return zeros, nonzeros
+
+
+def _is_counterexample(eval: 'ast.Algebraic') -> bool:
+    return not isinstance(eval, ast.Polynomial) or not eval.is_zero
+
+
+def _check_range(
+    diff: 'ast.Algebraic',
+    variables: t.Sequence[Symbol],
+    zeros: t.AbstractSet[SympyExpr],
+    nonzeros: t.AbstractSet[SympyExpr],
+    start: int,
+    stop: int,
+) -> t.Optional[_Failure]:
+    return _check_subtree(
+        diff, variables, len(variables), 0, zeros, nonzeros, start, stop
+    )
+
+
+def _check_subtree(
+    residual: 'ast.Algebraic',
+    variables: t.Sequence[Symbol],
+    k: int,
+    base: int,
+    zeros: t.AbstractSet[SympyExpr],
+    nonzeros: t.AbstractSet[SympyExpr],
+    start: int,
+    stop: int,
+) -> t.Optional[_Failure]:
+    """Check the assignments ``base`` to ``base + 2**k`` that are in the
+    range from ``start`` to ``stop``. They share the assignment of
+    ``variables[k:]``, which is already assigned in ``residual``, so
+    ``residual`` is simplified further one variable at a time, and both
+    children of a branch reuse it.
+    """
+
+    if base >= stop or base + (1 << k) <= start:
+        return None
+
+    # Another worker already found a counterexample with a lower index.
+    if _bound is not None and max(base, start) > _bound.value:
+        return None
+
+    # The residual is the same in all assignments of the subtree if it does
+    # not contain the variables that are left, so only the first is checked.
+    if k > 0 and not residual.free_variables.isdisjoint(variables[:k]):
+        v = variables[k - 1]
+
+        for bit, nonzero in enumerate((False, True)):
+            failure = _check_subtree(
+                residual.assign(v, nonzero),
+                variables,
+                k - 1,
+                base | (bit << (k - 1)),
+                zeros,
+                nonzeros,
+                start,
+                stop,
+            )
+
+            if failure is not None:
+                return failure
+
+        return None
+
+    if stats.enabled:
+        stats.count('assignments')
+
+    i = max(base, start)
+    var_zeros, var_nonzeros = assignment(variables, i)
+    cur_zeros = zeros | var_zeros
+    cur_nonzeros = nonzeros | var_nonzeros
+
+    debug.debug('Checking with zeros {}, nonzeros {}', cur_zeros, cur_nonzeros)
+
+    eval = residual.eval(cur_zeros, cur_nonzeros)
+
+    if _is_counterexample(eval):
+        if _bound is not None:
+            with _bound.get_lock():
+                _bound.value = min(_bound.value, i)
+
+        return i, eval
+
+    return None
+
+
+def _init_worker(
+    level: debug.DebugLevel,
+    stats_enabled: bool,
+    backend: str,
+    representation: str,
+    bound: t.Any,
+    diff: 'ast.Algebraic',
+    variables: t.Sequence[Symbol],
+    zeros: t.AbstractSet[SympyExpr],
+    nonzeros: t.AbstractSet[SympyExpr],
+) -> None:
+    global _bound, _diff, _variables, _zeros, _nonzeros
+
+    debug.set_level(level)
+    stats.set_enabled(stats_enabled)
+    ast.set_backend(backend)
+    ast.set_representation(representation)
+    _bound = bound
+    _diff = diff
+    _variables = variables
+    _zeros = zeros
+    _nonzeros = nonzeros
+
+
+def _check_worker_range(
+    start: int, stop: int
+) -> t.Tuple[t.Optional[_Failure], t.Optional[t.Dict[str, t.Any]]]:
+    """Check a range of assignments in a worker process. Also returns the
+    stats of the range if they are enabled, to add them to the stats of the
+    main process.
+    """
+
+    with ast.evaluation_memo(), stats.collect() as collected:
+        failure = _check_range(
+            _diff, _variables, _zeros, _nonzeros, start, stop
+        )
+
+    return failure, collected.as_dict() if stats.enabled else None
+
+
+def _search_parallel(
+    diff: 'ast.Algebraic',
+    variables: t.Sequence[Symbol],
+    zeros: t.AbstractSet[SympyExpr],
+    nonzeros: t.AbstractSet[SympyExpr],
+    jobs: int,
+) -> t.Optional[_Failure]:
+    total = pow(2, len(variables))
+    size = max(1, total // (jobs * 8))
+
+    # The lowest index of a counterexample found by any of the workers.
+    bound = multiprocessing.Value('q', total)
+    failure: t.Optional[_Failure] = None
+
+    executor = concurrent.futures.ProcessPoolExecutor(
+        max_workers=jobs,
+        initializer=_init_worker,
+        initargs=(
+            debug.get_level(),
+            stats.enabled,
+            ast.get_backend(),
+            ast.get_representation(),
+            bound,
+            diff,
+            variables,
+            zeros,
+            nonzeros,
+        ),
+    )
+
+    try:
+        pending = {
+            executor.submit(
+                _check_worker_range, start, min(start + size, total)
+            ): start
+            for start in range(0, total, size)
+        }
+
+        while pending:
+            done, _ = concurrent.futures.wait(
+                pending, return_when=concurrent.futures.FIRST_COMPLETED
+            )
+
+            for future in done:
+                del pending[future]
+                result, worker_stats = future.result()
+
+                if worker_stats is not None:
+                    stats.current().merge(worker_stats)
+
+                if result is not None and (
+                    failure is None or result[0] < failure[0]
+                ):
+                    failure = result
+
+            if failure is not None:
+                # Ranges after the counterexample can't contain a lower one.
+                for future, start in list(pending.items()):
+                    if start > failure[0]:
+                        future.cancel()
+                        del pending[future]
+    finally:
+        for future in pending:
+            future.cancel()
+
+        executor.shutdown(wait=True)
+
+    return failure
+
+
+def search(
+    diff: 'ast.Algebraic',
+    variables: t.Sequence[Symbol],
+    zeros: t.AbstractSet[SympyExpr],
+    nonzeros: t.AbstractSet[SympyExpr],
+) -> t.Optional[_Failure]:
+    """Find the first assignment of ``variables`` in which ``diff`` does not
+    evaluate to zero. Returns its index and the evaluated expression, or
+    ``None`` if there is no such assignment.
+
+    If more than one job is configured with ``set_jobs``, the assignments are
+    checked by a pool of processes. As soon as one of them finds a
+    counterexample, the ranges after it are cancelled, and the workers that
+    are still busy stop at the next assignment after it.
+    """
+
+    total = pow(2, len(variables))
+
+    if _jobs > 1 and total > _jobs:
+        return _search_parallel(diff, variables, zeros, nonzeros, _jobs)
+
+    return _check_range(diff, variables, zeros, nonzeros, 0, total)
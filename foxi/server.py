@@ -0,0 +1,353 @@
+# Copyright (c) 2019 Olmo Kramer <olmo.kramer@protonmail.com>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""A long-running prover that answers requests on a socket, and its client.
+
+Starting foxi imports sympy, and every run starts with cold caches. The
+server pays for both once: it proves the requests of all its clients in a
+fixed pool of ``Worker`` processes, which keep their caches between requests.
+
+The protocol is line based. A request is a line with an expression, or a JSON
+object with the ``expression`` and optionally a ``timeout`` in seconds, which
+defaults to the timeout of the server, and ``output``, which can be set to
+false to not print anything while proving. The server answers every request
+with a line with a JSON object of the fields of its ``Result``, and the
+``output`` that proving it printed. The answers on a connection are in the
+order of the requests, which are proven concurrently, so a client can send
+many requests before it reads the answers.
+
+An address is the path of a Unix domain socket, or ``HOST:PORT`` for TCP.
+"""
+
+import concurrent.futures
+import contextlib
+import io
+import json
+import os
+import queue
+import re
+import signal
+import socket
+import socketserver
+import sys
+import threading
+import typing as t
+
+from dataclasses import asdict
+
+from . import debug, prover, worker
+
+Address = t.Union[str, t.Tuple[str, int]]
+
+_TCP_ADDRESS_RE = re.compile(r'(?P<host>[\w.-]*):(?P<port>\d+)')
+
+
+def parse_address(text: str) -> Address:
+    match = _TCP_ADDRESS_RE.fullmatch(text)
+    if match is None:
+        return text
+
+    return match.group('host') or 'localhost', int(match.group('port'))
+
+
+def _prove(request: t.Tuple[str, bool]) -> t.Tuple[prover.Result, str]:
+    expr, output = request
+    level = debug.get_level()
+
+    if not output:
+        # Don't format messages that nobody reads.
+        debug.set_level(debug.DebugLevel.NONE)
+
+    with contextlib.redirect_stdout(io.StringIO()) as out:
+        try:
+            result = prover.prove(expr)
+        except Exception as e:
+            # Keep the worker, and its caches, alive.
+            result = prover.Result(expr, 'ERROR', error=repr(e))
+        finally:
+            debug.set_level(level)
+
+    return result, out.getvalue()
+
+
+def _timed_out(expr: str, timeout: float) -> t.Tuple[prover.Result, str]:
+    output = f'Timed out after {timeout} seconds: {expr}\n'
+    return prover.Result(expr, 'TIMEOUT', elapsed=timeout), output
+
+
+class _Pool:
+    """``jobs`` worker processes, each of which proves one expression at a
+    time, and is killed if it takes too long.
+    """
+
+    def __init__(
+        self,
+        jobs: int,
+        initializer: t.Optional[t.Callable[..., None]],
+        initargs: t.Sequence[t.Any],
+    ) -> None:
+        self.jobs = jobs
+        self._idle: 'queue.Queue[worker.Worker]' = queue.Queue()
+        self._workers = [
+            worker.Worker(_prove, initializer, initargs) for _ in range(jobs)
+        ]
+        for w in self._workers:
+            self._idle.put(w)
+
+        self._executor = concurrent.futures.ThreadPoolExecutor(jobs)
+
+    def submit(
+        self, expr: str, timeout: t.Optional[float], output: bool
+    ) -> 'concurrent.futures.Future[t.Tuple[prover.Result, str]]':
+        return self._executor.submit(self._run, expr, timeout, output)
+
+    def _run(
+        self, expr: str, timeout: t.Optional[float], output: bool
+    ) -> t.Tuple[prover.Result, str]:
+        w = self._idle.get()
+
+        try:
+            w.submit((expr, output))
+            if w.conn.poll(timeout):
+                return w.result()
+
+            assert timeout is not None
+            w.restart()
+            return _timed_out(expr, timeout)
+        except worker.WorkerError as e:
+            return prover.Result(expr, 'ERROR', error=str(e)), ''
+        except Exception as e:
+            # The worker died, for example because it ran out of memory, or
+            # its result may still be unread. Don't give the next request a
+            # stale answer.
+            w.restart()
+            return prover.Result(expr, 'ERROR', error=str(e)), ''
+        finally:
+            self._idle.put(w)
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False)
+        for w in self._workers:
+            w.kill()
+
+
+def _parse_request(
+    line: bytes, timeout: t.Optional[float]
+) -> t.Tuple[str, t.Optional[float], bool]:
+    text = line.decode().strip()
+    if not text.startswith('{'):
+        return text, timeout, True
+
+    request = json.loads(text)
+    if 'timeout' in request:
+        timeout = float(request['timeout'])
+        if not timeout > 0:
+            raise ValueError(f'Invalid timeout: {timeout}')
+
+    return (
+        str(request['expression']),
+        timeout,
+        bool(request.get('output', True)),
+    )
+
+
+def _invalid(line: bytes, e: Exception) -> 'concurrent.futures.Future[t.Any]':
+    expr = line.decode(errors='replace').strip()
+    future: 'concurrent.futures.Future[t.Any]' = concurrent.futures.Future()
+    future.set_result(
+        (prover.Result(expr, 'ERROR', error=f'Invalid request: {e}'), '')
+    )
+    return future
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    """Prove the requests of a connection concurrently, and write their
+    answers in order as soon as they are done. At most four requests per
+    worker are in flight, so a client that sends faster than the workers
+    prove is held back instead of queueing everything it sends.
+    """
+
+    server: '_Server'
+
+    def handle(self) -> None:
+        pool = self.server.pool
+        timeout = self.server.request_timeout
+
+        answers: 'queue.Queue[t.Optional[concurrent.futures.Future]]'
+        answers = queue.Queue()
+        in_flight = threading.Semaphore(pool.jobs * 4)
+        writer = threading.Thread(
+            target=self._write, args=(answers, in_flight)
+        )
+        writer.start()
+
+        try:
+            for line in self.rfile:
+                in_flight.acquire()
+                try:
+                    answers.put(pool.submit(*_parse_request(line, timeout)))
+                except (ValueError, KeyError, TypeError) as e:
+                    answers.put(_invalid(line, e))
+        finally:
+            answers.put(None)
+            writer.join()
+
+    def _write(
+        self,
+        answers: 'queue.Queue[t.Optional[concurrent.futures.Future]]',
+        in_flight: threading.Semaphore,
+    ) -> None:
+        while True:
+            future = answers.get()
+            if future is None:
+                return
+
+            try:
+                result, output = future.result()
+            except Exception as e:
+                # Keep answering the other requests.
+                result = prover.Result('', 'ERROR', error=repr(e))
+                output = ''
+            finally:
+                in_flight.release()
+            record = {**asdict(result), 'output': output}
+
+            try:
+                self.wfile.write(json.dumps(record).encode() + b'\n')
+                self.wfile.flush()
+            except OSError:
+                # The client went away. Drain the remaining answers.
+                pass
+
+
+class _Server(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    pool: _Pool
+    request_timeout: t.Optional[float]
+
+
+class _UnixServer(_Server):
+    address_family = socket.AF_UNIX
+
+
+def serve(
+    address: Address,
+    jobs: int = 1,
+    timeout: t.Optional[float] = None,
+    initializer: t.Optional[t.Callable[..., None]] = None,
+    initargs: t.Sequence[t.Any] = (),
+) -> None:
+    """Answer proof requests on ``address`` until the process is interrupted
+    or terminated. The requests are proven in ``jobs`` worker processes, which
+    call ``initializer`` with ``initargs`` when they start. Requests without a
+    timeout of their own take at most ``timeout`` seconds.
+    """
+
+    # Clean up on SIGTERM as well as on ^C.
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+
+    server_class = _UnixServer if isinstance(address, str) else _Server
+    pool = _Pool(jobs, initializer, initargs)
+
+    try:
+        # Mypy only knows the TCP addresses of ``TCPServer``, but the Unix
+        # server binds to a path.
+        with server_class(address, _Handler) as server:  # type: ignore
+            server.pool = pool
+            server.request_timeout = timeout
+            debug.info('Listening on {}', address)
+            server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        pool.close()
+        if isinstance(address, str):
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(address)
+
+
+class Client:
+    """A connection to the server at ``address``.
+    """
+
+    def __init__(self, address: Address) -> None:
+        if isinstance(address, str):
+            self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self._sock.connect(address)
+        else:
+            self._sock = socket.create_connection(address)
+
+    def close(self) -> None:
+        self._sock.close()
+
+    def __enter__(self) -> 'Client':
+        return self
+
+    def __exit__(self, *args: t.Any) -> None:
+        self.close()
+
+    def _send(
+        self, exprs: t.Iterable[str], timeout: t.Optional[float], output: bool
+    ) -> None:
+        with self._sock.makefile('wb') as f:
+            for expr in exprs:
+                request: t.Dict[str, t.Any] = {'expression': expr}
+                if timeout is not None:
+                    request['timeout'] = timeout
+                if not output:
+                    request['output'] = False
+
+                f.write(json.dumps(request).encode() + b'\n')
+                f.flush()
+
+        self._sock.shutdown(socket.SHUT_WR)
+
+    def prove_many(
+        self,
+        exprs: t.Iterable[str],
+        timeout: t.Optional[float] = None,
+        output: bool = True,
+    ) -> t.Iterator[t.Tuple[prover.Result, str]]:
+        """Prove each of ``exprs`` on the server, yielding the results in
+        input order, together with what proving them printed if ``output`` is
+        set. ``exprs`` is sent from another thread while the results are read,
+        so it is consumed lazily, but ahead of the results. Each expression
+        takes at most ``timeout`` seconds, if given.
+        """
+
+        sender = threading.Thread(
+            target=self._send, args=(exprs, timeout, output), daemon=True
+        )
+        sender.start()
+
+        with self._sock.makefile('rb') as f:
+            for line in f:
+                record = json.loads(line)
+                printed = record.pop('output')
+                yield prover.Result(**record), printed
+
+        sender.join()
+
+    def prove(
+        self, expr: str, timeout: t.Optional[float] = None
+    ) -> prover.Result:
+        """Prove a single expression on the server. The connection can't be
+        used anymore afterwards.
+        """
+
+        (result, _), = self.prove_many([expr], timeout, output=False)
+        return result
@@ -0,0 +1,356 @@
+# Copyright (c) 2019 Olmo Kramer <olmo.kramer@protonmail.com>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Exact sparse polynomials with rational coefficients.
+
+``SparsePoly`` is an alternative to sympy expressions for the terms of an
+``ast.Polynomial``. It supports the part of the sympy interface that ``ast``
+uses, but represents a polynomial as a mapping from monomials to ``Fraction``
+coefficients, so adding, multiplying, substituting zero for a variable and
+testing for zero don't go through sympy's generic expression trees.
+Factorization handles constants, monomials and linear polynomials itself and
+only falls back to sympy for the remaining polynomials.
+"""
+
+import math
+import typing as t
+
+from fractions import Fraction
+
+from .sympy_types import SympyExpr, sympify
+
+# A monomial is a tuple of (variable name, exponent) pairs, sorted by name.
+Monomial = t.Tuple[t.Tuple[str, int], ...]
+
+_Number = t.Union[int, Fraction]
+
+
+def _as_fraction(value: t.Any) -> t.Optional[Fraction]:
+    if isinstance(value, (int, Fraction)):
+        return Fraction(value)
+
+    if getattr(value, 'is_Rational', False):
+        return Fraction(int(value.p), int(value.q))
+
+    if getattr(value, 'is_Float', False):
+        return Fraction(str(value))
+
+    return None
+
+
+def _mul_monomials(m1: Monomial, m2: Monomial) -> Monomial:
+    if not m1:
+        return m2
+
+    if not m2:
+        return m1
+
+    powers = dict(m1)
+    for v, e in m2:
+        powers[v] = powers.get(v, 0) + e
+
+    return tuple(sorted(powers.items()))
+
+
+class SparsePoly:
+    __slots__ = ('terms', '_hash', '_free_symbols')
+
+    terms: t.Dict[Monomial, Fraction]
+
+    def __init__(self, terms: t.Dict[Monomial, Fraction]) -> None:
+        """The coefficients in ``terms`` must be nonzero.
+        """
+
+        self.terms = terms
+        self._hash: t.Optional[int] = None
+        self._free_symbols: t.Optional[t.FrozenSet['SparsePoly']] = None
+
+    @classmethod
+    def constant(cls, value: _Number) -> 'SparsePoly':
+        value = Fraction(value)
+        return cls({(): value} if value else {})
+
+    @classmethod
+    def variable(cls, name: str) -> 'SparsePoly':
+        return cls({((name, 1),): Fraction(1)})
+
+    @classmethod
+    def from_sympy(cls, expr: SympyExpr) -> 'SparsePoly':
+        value = _as_fraction(expr)
+        if value is not None:
+            return cls.constant(value)
+
+        from sympy import Poly  # type: ignore
+
+        gens = sorted(expr.free_symbols, key=str)
+        names = [str(g) for g in gens]
+        terms: t.Dict[Monomial, Fraction] = {}
+
+        for exps, coeff in Poly(expr, *gens).terms():
+            monomial = tuple((v, e) for v, e in zip(names, exps) if e)
+            # The coefficients of a polynomial are numbers.
+            value = _as_fraction(coeff)
+            assert value is not None
+            terms[monomial] = value
+
+        return cls(terms)
+
+    def as_expr(self) -> SympyExpr:
+        from sympy import Add, Mul, Rational, Symbol
+
+        return Add(
+            *(
+                Mul(
+                    Rational(c.numerator, c.denominator),
+                    *(Symbol(v) ** e for v, e in m),
+                )
+                for m, c in self.terms.items()
+            )
+        )
+
+    def __repr__(self) -> str:
+        return repr(self.as_expr())
+
+    def __hash__(self) -> int:
+        if self._hash is None:
+            if self.is_number:
+                # Agree with the hash of the equal int or Fraction.
+                self._hash = hash(self.terms.get((), Fraction(0)))
+            else:
+                self._hash = hash(frozenset(self.terms.items()))
+
+        return self._hash
+
+    def __eq__(self, other: t.Any) -> bool:
+        if isinstance(other, SparsePoly):
+            return self.terms == other.terms
+
+        value = _as_fraction(other)
+        if value is None:
+            return False
+
+        return self.is_number and self.terms.get((), Fraction(0)) == value
+
+    @property
+    def is_zero(self) -> bool:
+        return not self.terms
+
+    @property
+    def is_number(self) -> bool:
+        return not self.terms or (len(self.terms) == 1 and () in self.terms)
+
+    @property
+    def free_symbols(self) -> t.FrozenSet['SparsePoly']:
+        if self._free_symbols is None:
+            self._free_symbols = frozenset(
+                SparsePoly.variable(v) for m in self.terms for v, _ in m
+            )
+
+        return self._free_symbols
+
+    @property
+    def degree(self) -> int:
+        return max((sum(e for _, e in m) for m in self.terms), default=0)
+
+    def __neg__(self) -> 'SparsePoly':
+        return SparsePoly({m: -c for m, c in self.terms.items()})
+
+    def __add__(self, other: 'SparsePoly') -> 'SparsePoly':
+        terms = dict(self.terms)
+
+        for m, c in other.terms.items():
+            c += terms.get(m, 0)
+            if c:
+                terms[m] = c
+            else:
+                terms.pop(m, None)
+
+        return SparsePoly(terms)
+
+    def __mul__(self, other: 'SparsePoly') -> 'SparsePoly':
+        terms: t.Dict[Monomial, Fraction] = {}
+
+        for m1, c1 in self.terms.items():
+            for m2, c2 in other.terms.items():
+                m = _mul_monomials(m1, m2)
+                c = terms.get(m, 0) + c1 * c2
+                if c:
+                    terms[m] = c
+                else:
+                    terms.pop(m, None)
+
+        return SparsePoly(terms)
+
+    def __truediv__(self, other: 'SparsePoly') -> 'SparsePoly':
+        if not other.is_number or other.is_zero:
+            raise ZeroDivisionError(f'Can\'t divide {self} by {other}.')
+
+        value = other.terms[()]
+        return SparsePoly({m: c / value for m, c in self.terms.items()})
+
+    def subs(self, sub: t.Mapping[t.Any, t.Any]) -> 'SparsePoly':
+        """Substitute zero for the keys of ``sub``. Variables are substituted
+        by dropping the terms they occur in. A polynomial that is not a
+        variable falls back to sympy's ``subs``.
+        """
+
+        zeros = set()
+        others = {}
+
+        for key, value in sub.items():
+            if value != 0:
+                raise ValueError('Only zero can be substituted.')
+
+            name = key.variable_name if isinstance(key, SparsePoly) else None
+
+            if name is not None:
+                zeros.add(name)
+            elif key == self:
+                return SparsePoly({})
+            elif not isinstance(key, SparsePoly) or not key.is_number:
+                others[key] = value
+
+        ret = self
+        if zeros:
+            ret = SparsePoly(
+                {
+                    m: c
+                    for m, c in self.terms.items()
+                    if not any(v in zeros for v, _ in m)
+                }
+            )
+
+        if others and not ret.is_number:
+            expr = ret.as_expr().subs(
+                {
+                    k.as_expr() if isinstance(k, SparsePoly) else k: v
+                    for k, v in others.items()
+                }
+            )
+            ret = SparsePoly.from_sympy(expr)
+
+        return ret
+
+    @property
+    def variable_name(self) -> t.Optional[str]:
+        """Get the name of the variable if this polynomial is a variable.
+        """
+
+        if len(self.terms) != 1:
+            return None
+
+        (m, c), = self.terms.items()
+        if c != 1 or len(m) != 1 or m[0][1] != 1:
+            return None
+
+        return m[0][0]
+
+    def _divide_monomial(self, monomial: Monomial) -> 'SparsePoly':
+        powers = dict(monomial)
+        terms = {}
+
+        for m, c in self.terms.items():
+            quotient = tuple(
+                (v, e - powers.get(v, 0))
+                for v, e in m
+                if e != powers.get(v, 0)
+            )
+            terms[quotient] = c
+
+        return SparsePoly(terms)
+
+    def _common_monomial(self) -> Monomial:
+        monomials = iter(self.terms)
+        common = dict(next(monomials))
+
+        for m in monomials:
+            powers = dict(m)
+            common = {
+                v: min(e, powers[v]) for v, e in common.items() if v in powers
+            }
+
+        return tuple(sorted(common.items()))
+
+    def primitive(self) -> 'SparsePoly':
+        """Divide by the content, so the coefficients are coprime integers and
+        the coefficient of the first monomial is positive. Associated factors
+        have the same primitive part.
+        """
+
+        denominator = 1
+        for c in self.terms.values():
+            denominator = (
+                denominator
+                * c.denominator
+                // math.gcd(denominator, c.denominator)
+            )
+
+        numerators = [int(c * denominator) for c in self.terms.values()]
+
+        content = 0
+        for n in numerators:
+            content = math.gcd(content, n)
+
+        if self.terms[min(self.terms)] < 0:
+            content = -content
+
+        return SparsePoly(
+            {m: Fraction(n, content) for m, n in zip(self.terms, numerators)}
+        )
+
+    def factor_list(self) -> t.Tuple['SparsePoly', ...]:
+        """Get the distinct irreducible factors, as primitive polynomials.
+        Constants are their own only factor, like sympy's ``as_terms``.
+        """
+
+        if self.is_number:
+            return (self,)
+
+        common = self._common_monomial()
+        factors = [SparsePoly.variable(v) for v, _ in common]
+        rest = self._divide_monomial(common)
+
+        if rest.is_number:
+            return tuple(factors)
+
+        if rest.degree == 1:
+            factors.append(rest.primitive())
+        else:
+            from sympy import factor_list
+
+            _, sympy_factors = factor_list(rest.as_expr())
+            factors.extend(
+                SparsePoly.from_sympy(f).primitive() for f, _ in sympy_factors
+            )
+
+        return tuple(factors)
+
+
+def convert(
+    term: t.Union[float, int, str, SympyExpr, SparsePoly]
+) -> SparsePoly:
+    if isinstance(term, SparsePoly):
+        return term
+
+    if isinstance(term, (int, Fraction)):
+        return SparsePoly.constant(term)
+
+    if getattr(term, 'is_Symbol', False):
+        return SparsePoly.variable(str(term))
+
+    if isinstance(term, (float, str)):
+        term = sympify(term)
+
+    return SparsePoly.from_sympy(term)
@@ -0,0 +1,136 @@
+# Copyright (c) 2019 Olmo Kramer <olmo.kramer@protonmail.com>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Opt-in operation counters and timers.
+
+Collection is disabled by default. Hot paths check ``enabled`` before they
+count or time anything, so disabled stats cost one global lookup.
+
+>>> stats.set_enabled(True)
+>>> with stats.collect() as s:
+...     foxi.prove('x / x * x = x')
+>>> print(s.summary())
+"""
+
+import collections
+import contextlib
+import time
+import typing as t
+
+# Whether operations are counted and timed.
+enabled = False
+
+
+class Stats:
+    """Counts of operations, and the total seconds spent in timed phases.
+    Nested timers of the same phase are only timed once.
+    """
+
+    counters: t.Counter[str]
+    timers: t.Dict[str, float]
+
+    def __init__(self) -> None:
+        self.counters = collections.Counter()
+        self.timers = collections.defaultdict(float)
+        self._running: t.Counter[str] = collections.Counter()
+
+    def count(self, name: str, n: int = 1) -> None:
+        self.counters[name] += n
+
+    @contextlib.contextmanager
+    def timer(self, name: str) -> t.Iterator[None]:
+        if self._running[name]:
+            yield
+            return
+
+        self._running[name] += 1
+        start = time.perf_counter()
+
+        try:
+            yield
+        finally:
+            self.timers[name] += time.perf_counter() - start
+            self._running[name] -= 1
+
+    def merge(self, other: t.Union['Stats', t.Dict[str, t.Any]]) -> None:
+        if isinstance(other, Stats):
+            other = other.as_dict()
+
+        self.counters.update(other['counters'])
+        for name, seconds in other['timers'].items():
+            self.timers[name] += seconds
+
+    def as_dict(self) -> t.Dict[str, t.Any]:
+        return {'counters': dict(self.counters), 'timers': dict(self.timers)}
+
+    def summary(self) -> str:
+        lines = [
+            f'  {name:<24} {n:>12}'
+            for name, n in sorted(self.counters.items())
+        ]
+        lines.extend(
+            f'  {name:<24} {seconds:>11.6f}s'
+            for name, seconds in sorted(self.timers.items())
+        )
+        return '\n'.join(lines)
+
+
+# The stats of the innermost ``collect`` scope are last. The first one
+# collects everything in this process.
+_stack = [Stats()]
+
+
+def set_enabled(flag: bool) -> None:
+    global enabled
+    enabled = flag
+
+
+def current() -> Stats:
+    return _stack[-1]
+
+
+def total() -> Stats:
+    """Get the stats of everything that was collected in this process.
+    """
+
+    return _stack[0]
+
+
+def reset() -> None:
+    _stack[0] = Stats()
+
+
+def count(name: str, n: int = 1) -> None:
+    _stack[-1].count(name, n)
+
+
+def timer(name: str) -> t.ContextManager[None]:
+    return _stack[-1].timer(name)
+
+
+@contextlib.contextmanager
+def collect() -> t.Iterator[Stats]:
+    """Collect the stats of this scope separately. They are added to the
+    enclosing scope when it ends.
+    """
+
+    stats = Stats()
+    _stack.append(stats)
+
+    try:
+        yield stats
+    finally:
+        _stack.pop()
+        _stack[-1].merge(stats)
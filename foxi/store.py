@@ -0,0 +1,177 @@
+# Copyright (c) 2019 Olmo Kramer <olmo.kramer@protonmail.com>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Persistent cache of proof results in an SQLite database.
+
+Entries are keyed on a hash of the foxi version, the version of the stored
+results and the expression, so a new version of foxi never sees the results
+of an older one. The database is
+opened in WAL mode with a busy timeout, so any number of processes can read
+and write it concurrently.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import time
+import typing as t
+
+from . import __version__
+
+# The version of the stored results. ``__version__`` is not bumped for every
+# change, so bump this whenever the verdicts, residuals or counterexamples
+# that the prover stores change, for example with the canonical form of the
+# expressions.
+_RESULTS_VERSION = 1
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS proofs (
+    key TEXT PRIMARY KEY,
+    version TEXT NOT NULL,
+    expression TEXT NOT NULL,
+    verdict TEXT NOT NULL,
+    residual TEXT,
+    counterexample TEXT,
+    created REAL NOT NULL,
+    accessed REAL NOT NULL
+)
+'''
+
+
+class Entry(t.NamedTuple):
+    verdict: str
+    residual: t.Optional[str]
+    counterexample: t.Optional[t.Dict[str, str]]
+
+
+def normalize(expr: str) -> str:
+    return ' '.join(expr.split())
+
+
+class ProofCache:
+    """Proof results stored in the SQLite database at ``path``.
+
+    A connection is opened lazily by each process that uses the cache, so
+    instances can be passed to worker processes.
+    """
+
+    path: str
+    version: str
+
+    def __init__(self, path: str, version: str = __version__) -> None:
+        self.path = path
+        self.version = version
+        self._version = f'{version}+{_RESULTS_VERSION}'
+        self._conn: t.Optional[sqlite3.Connection] = None
+        self._pid: t.Optional[int] = None
+
+    @classmethod
+    def in_dir(cls, cache_dir: str) -> 'ProofCache':
+        os.makedirs(cache_dir, exist_ok=True)
+        return cls(os.path.join(cache_dir, 'proofs.sqlite'))
+
+    def __getstate__(self) -> t.Dict[str, t.Any]:
+        return {'path': self.path, 'version': self.version}
+
+    def __setstate__(self, state: t.Dict[str, t.Any]) -> None:
+        self.__init__(state['path'], state['version'])  # type: ignore
+
+    @property
+    def _db(self) -> sqlite3.Connection:
+        # Connections can't be shared with forked processes.
+        if self._conn is None or self._pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(_SCHEMA)
+            self._conn = conn
+            self._pid = os.getpid()
+
+        return self._conn
+
+    def key(self, expr: str) -> str:
+        text = f'{self._version}\0{normalize(expr)}'
+        return hashlib.sha256(text.encode()).hexdigest()
+
+    def get(self, expr: str) -> t.Optional[Entry]:
+        key = self.key(expr)
+        row = self._db.execute(
+            'SELECT verdict, residual, counterexample FROM proofs'
+            ' WHERE key = ?',
+            (key,),
+        ).fetchone()
+
+        if row is None:
+            return None
+
+        self._db.execute(
+            'UPDATE proofs SET accessed = ? WHERE key = ?', (time.time(), key)
+        )
+
+        verdict, residual, counterexample = row
+        if counterexample is not None:
+            counterexample = json.loads(counterexample)
+
+        return Entry(verdict, residual, counterexample)
+
+    def put(
+        self,
+        expr: str,
+        verdict: str,
+        residual: t.Optional[str] = None,
+        counterexample: t.Optional[t.Dict[str, str]] = None,
+    ) -> None:
+        encoded = None
+        if counterexample is not None:
+            encoded = json.dumps(counterexample)
+
+        now = time.time()
+        self._db.execute(
+            'INSERT OR REPLACE INTO proofs VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+            (
+                self.key(expr),
+                self._version,
+                normalize(expr),
+                verdict,
+                residual,
+                encoded,
+                now,
+                now,
+            ),
+        )
+
+    def invalidate(self, expr: str) -> None:
+        self._db.execute('DELETE FROM proofs WHERE key = ?', (self.key(expr),))
+
+    def prune(self, max_age: t.Optional[float] = None) -> int:
+        """Delete the entries of other versions, and, if ``max_age`` is
+        given, the entries that were not used in the last ``max_age``
+        seconds. Returns the number of deleted entries.
+        """
+
+        cursor = self._db.execute(
+            'DELETE FROM proofs WHERE version != ? OR accessed < ?',
+            (
+                self._version,
+                -1.0 if max_age is None else time.time() - max_age,
+            ),
+        )
+        return cursor.rowcount
+
+    def clear(self) -> None:
+        self._db.execute('DELETE FROM proofs')
+
+    def __len__(self) -> int:
+        return self._db.execute('SELECT COUNT(*) FROM proofs').fetchone()[0]
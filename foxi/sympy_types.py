@@ -33,6 +33,12 @@ if t.TYPE_CHECKING:
         def factor(self) -> 'SympyExpr':
             ...
 
+        def expand(self) -> 'SympyExpr':
+            ...
+
+        def could_extract_minus_sign(self) -> bool:
+            ...
+
         def subs(
             self, sub: t.Mapping['SympyExpr', t.Union[int, 'SympyExpr']]
         ) -> 'SympyExpr':
@@ -41,6 +47,10 @@ if t.TYPE_CHECKING:
         def as_terms(self) -> t.Tuple[t.Any, t.Sequence['SympyExpr']]:
             ...
 
+        @property
+        def args(self) -> t.Tuple['SympyExpr', ...]:
+            ...
+
         @property
         def free_symbols(self) -> t.Set['Symbol']:
             ...
@@ -66,16 +76,32 @@ if t.TYPE_CHECKING:
         def __init__(self, num: t.Union[float, int]) -> None:
             ...
 
+    class Rational(Number):
+        def __init__(self, num: t.Union[int, str]) -> None:
+            ...
+
+        @property
+        def p(self) -> int:
+            ...
+
+        @property
+        def q(self) -> int:
+            ...
+
     class Symbol(SympyExpr):
         def __init__(self, name: str) -> None:
             ...
 
+        @property
+        def name(self) -> str:
+            ...
+
     def sympify(term: t.Union[float, int, str]) -> SympyExpr:
         ...
 
 
 else:
-    from sympy import Add, Mul, Pow, Number, Symbol, sympify
+    from sympy import Add, Mul, Pow, Number, Rational, Symbol, sympify
 
     SympyExpr = t.Union[Add, Mul, Pow, Number, Symbol]
 
@@ -0,0 +1,203 @@
+# Copyright (c) 2019 Olmo Kramer <olmo.kramer@protonmail.com>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Worker processes that can be killed in the middle of a call.
+
+A ``concurrent.futures`` pool can't cancel a call that is already running, so
+a call that runs into an exponential case split or a slow ``factor`` blocks
+its worker forever. A ``Worker`` runs one call at a time in its own process
+group, which is killed, together with the processes of a parallel search,
+when the call takes too long.
+"""
+
+import collections
+import multiprocessing
+import multiprocessing.connection
+import os
+import signal
+import time
+import typing as t
+
+_T = t.TypeVar('_T')
+_R = t.TypeVar('_R')
+
+
+class WorkerError(Exception):
+    """A call in a worker raised an exception, or the worker died.
+    """
+
+
+def _serve(
+    conn: multiprocessing.connection.Connection,
+    func: t.Callable[[t.Any], t.Any],
+    initializer: t.Optional[t.Callable[..., None]],
+    initargs: t.Sequence[t.Any],
+) -> None:
+    if hasattr(os, 'setpgrp'):
+        os.setpgrp()
+
+    if initializer is not None:
+        initializer(*initargs)
+
+    while True:
+        try:
+            item = conn.recv()
+        except EOFError:
+            return
+
+        try:
+            result = func(item)
+        except Exception as e:
+            # Keep the process, and its caches, alive.
+            result = WorkerError(repr(e))
+
+        conn.send(result)
+
+
+class Worker:
+    """A process that applies ``func`` to the items sent to it, one at a
+    time. ``initializer`` is called with ``initargs`` when the process
+    starts.
+    """
+
+    conn: multiprocessing.connection.Connection
+
+    def __init__(
+        self,
+        func: t.Callable[[t.Any], t.Any],
+        initializer: t.Optional[t.Callable[..., None]] = None,
+        initargs: t.Sequence[t.Any] = (),
+    ) -> None:
+        self._args = (func, initializer, initargs)
+        self._start()
+
+    def _start(self) -> None:
+        self.conn, child = multiprocessing.Pipe()
+        self._process = multiprocessing.Process(
+            target=_serve, args=(child, *self._args)
+        )
+        self._process.start()
+        child.close()
+
+    def submit(self, item: t.Any) -> None:
+        self.conn.send(item)
+
+    def result(self) -> t.Any:
+        """Receive the result of the last item. Raises ``WorkerError`` if the
+        call raised, and ``EOFError`` if the process died.
+        """
+
+        result = self.conn.recv()
+        if isinstance(result, WorkerError):
+            raise result
+
+        return result
+
+    def kill(self) -> None:
+        """Kill the process and everything it started.
+        """
+
+        pid = self._process.pid
+        assert pid is not None
+
+        try:
+            os.killpg(pid, signal.SIGKILL)
+        except (AttributeError, ProcessLookupError):
+            # No process groups, or the process has not created its group
+            # yet.
+            self._process.kill()
+
+        self._process.join()
+        self.conn.close()
+
+    def restart(self) -> None:
+        self.kill()
+        self._start()
+
+
+def map_with_timeout(
+    func: t.Callable[[_T], _R],
+    items: t.Iterable[_T],
+    jobs: int,
+    timeout: float,
+    initializer: t.Optional[t.Callable[..., None]] = None,
+    initargs: t.Sequence[t.Any] = (),
+) -> t.Iterator[t.Tuple[_T, t.Union[_R, None, WorkerError]]]:
+    """Apply ``func`` to each of ``items`` in ``jobs`` worker processes,
+    yielding the items with their results in input order. A call that takes
+    more than ``timeout`` seconds is killed, and yields ``None`` as its
+    result. A call that raises, or whose worker dies, yields a
+    ``WorkerError`` as its result. ``items`` is consumed lazily.
+    """
+
+    workers = [Worker(func, initializer, initargs) for _ in range(jobs)]
+    idle = list(workers)
+    busy: t.Dict[Worker, t.Tuple[int, float]] = {}
+    done: t.Dict[int, t.Union[_R, None, WorkerError]] = {}
+    pending: t.Deque[t.Tuple[int, _T]] = collections.deque()
+
+    it = enumerate(items)
+    exhausted = False
+
+    try:
+        while True:
+            while idle and not exhausted and len(pending) < jobs * 4:
+                try:
+                    index, item = next(it)
+                except StopIteration:
+                    exhausted = True
+                    break
+
+                w = idle.pop()
+                w.submit(item)
+                busy[w] = index, time.monotonic() + timeout
+                pending.append((index, item))
+
+            while pending and pending[0][0] in done:
+                index, item = pending.popleft()
+                yield item, done.pop(index)
+
+            if not busy:
+                if exhausted and not pending:
+                    return
+                continue
+
+            deadline = min(d for _, d in busy.values())
+            ready = multiprocessing.connection.wait(
+                [w.conn for w in busy], max(0.0, deadline - time.monotonic())
+            )
+
+            for w, (index, deadline) in list(busy.items()):
+                if w.conn in ready:
+                    try:
+                        done[index] = w.result()
+                    except WorkerError as e:
+                        done[index] = e
+                    except (EOFError, OSError) as e:
+                        # The worker died, for example because it ran out
+                        # of memory.
+                        w.restart()
+                        done[index] = WorkerError(repr(e))
+                elif time.monotonic() >= deadline:
+                    w.restart()
+                    done[index] = None
+                else:
+                    continue
+
+                del busy[w]
+                idle.append(w)
+    finally:
+        for w in workers:
+            w.kill()
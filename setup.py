@@ -23,4 +23,8 @@ setup(
     install_requires=[
         'sympy',
     ],
+    extras_require={
+        # Evaluates the points of --refute all at once.
+        'fast': ['numpy'],
+    },
 )
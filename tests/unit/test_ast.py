@@ -0,0 +1,229 @@
+# Copyright (c) 2019 Olmo Kramer <olmo.kramer@protonmail.com>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import pickle
+import typing as t
+import unittest
+
+from foxi import ast, parser, prover, sparse
+from foxi.sympy_types import Symbol
+
+
+class InternTest(unittest.TestCase):
+    def test_identity(self) -> None:
+        x = Symbol('x')
+        self.assertIs(ast.Polynomial(x + 1), ast.Polynomial(x + 1))
+
+        # Built separately, without the parse and operation caches.
+        first = parser._parse('(x / y) + (1 / x)')
+        ast.clear_operation_cache()
+        self.assertIs(parser._parse('(x / y) + (1 / x)'), first)
+
+    def test_pickle(self) -> None:
+        # Unpickled nodes are interned again.
+        expr = parser.parse('(x / y) + (1 / x)')
+        self.assertIs(pickle.loads(pickle.dumps(expr)), expr)
+
+        equation = parser.parse('x / y = 1')
+        assert isinstance(equation, ast.Equation)
+        copy = pickle.loads(pickle.dumps(equation))
+        self.assertIs(copy.lhs, equation.lhs)
+        self.assertIs(copy.rhs, equation.rhs)
+
+    def test_immutable(self) -> None:
+        expr = parser.parse('x / y')
+        with self.assertRaises(AttributeError):
+            expr.lhs = ast.Polynomial(1)  # type: ignore
+
+
+class EvaluationMemoTest(unittest.TestCase):
+    def tearDown(self) -> None:
+        ast.set_eval_memo_size(65536)
+
+    def eval(self, text: str) -> ast.Algebraic:
+        expr = parser.parse(text)
+        assert isinstance(expr, ast.Algebraic)
+        return expr.eval(frozenset(), frozenset(expr.free_variables))
+
+    def test_scope(self) -> None:
+        self.assertIsNone(ast._eval_memo)
+
+        with ast.evaluation_memo() as memo:
+            self.assertEqual(memo.maxsize, 65536)
+
+            first = self.eval('(x / y) + (y / x)')
+            self.assertGreater(len(memo), 0)
+            self.assertEqual(memo.hits, 0)
+
+            self.assertIs(self.eval('(x / y) + (y / x)'), first)
+            self.assertEqual(memo.hits, 1)
+
+            # Nested scopes share the table of the outermost one.
+            with ast.evaluation_memo() as nested:
+                self.assertIs(nested, memo)
+
+        self.assertIsNone(ast._eval_memo)
+
+    def test_bound(self) -> None:
+        ast.set_eval_memo_size(2)
+        expected = self.eval('((x / y) + (y / z)) * (z / x)')
+
+        with ast.evaluation_memo() as memo:
+            self.assertIs(
+                self.eval('((x / y) + (y / z)) * (z / x)'), expected
+            )
+            self.assertLessEqual(len(memo), 2)
+
+    def test_disabled(self) -> None:
+        ast.set_eval_memo_size(0)
+
+        with ast.evaluation_memo() as memo:
+            self.eval('(x / y) + (y / x)')
+            self.assertEqual(len(memo), 0)
+
+
+class BackendTest(unittest.TestCase):
+    def tearDown(self) -> None:
+        ast.set_backend('sympy')
+
+    def test_interned_numbers(self) -> None:
+        # Alive nodes of the old backend are not reused by the new one.
+        two = ast.Polynomial(2)
+        ast.set_backend('sparse')
+
+        self.assertIsNot(ast.Polynomial(2), two)
+        self.assertIsInstance(ast.Polynomial(2).terms, sparse.SparsePoly)
+
+    def test_switch(self) -> None:
+        exprs = ['(x / (y + 1)) * (y + 1) = x', '(x / x) * x = x + 0']
+
+        for backend in ('sparse', 'sympy', 'sparse'):
+            ast.set_backend(backend)
+            self.assertEqual(
+                [r.verdict for r in prover.prove_many(exprs)],
+                ['FALSE', 'TRUE'],
+                backend,
+            )
+
+
+def _nodes(
+    f: ast.Algebraic, path: t.Tuple[ast.Polynomial, ...] = ()
+) -> t.Iterator[t.Tuple[ast.SMFN, t.Tuple[ast.Polynomial, ...]]]:
+    """Get the ``SMFN`` nodes of ``f`` with the conditions above them.
+    """
+
+    if isinstance(f, ast.SMFN):
+        yield f, path
+        yield from _nodes(f.P, path + (f.cond,))
+        yield from _nodes(f.Q, path + (f.cond,))
+
+
+class DiagramTest(unittest.TestCase):
+    exprs = [
+        '(1 / (x*y)) + (1 / z)',
+        '((x / y) + (y / z)) * (z / x)',
+        '((x / y) + (y / x)) / ((x*y) / (z + 1))',
+        '(x / (y*z)) + ((y + 1) / x) + (z / (x*y))',
+    ]
+
+    def setUp(self) -> None:
+        ast.set_representation('diagram')
+
+    def tearDown(self) -> None:
+        ast.set_representation('tree')
+
+    def test_invariants(self) -> None:
+        for text in self.exprs:
+            expr = parser.parse(text)
+            assert isinstance(expr, ast.Algebraic)
+            nodes = list(_nodes(expr))
+            self.assertTrue(nodes, text)
+
+            for node, path in nodes:
+                # Every node tests one irreducible factor, later in the
+                # order than the factors above it, and is reduced.
+                self.assertEqual(len(node.cond.factors), 1, text)
+                keys = [ast._cond_key(c) for c in path + (node.cond,)]
+                self.assertEqual(keys, sorted(set(keys)), text)
+                self.assertNotEqual(node.P, node.Q, text)
+
+    def test_split(self) -> None:
+        # The tree tests x*y at once, the diagram tests x and y apart.
+        ast.set_representation('tree')
+        tree = parser.parse('(1 / (x*y)) + (1 / z)')
+        assert isinstance(tree, ast.Algebraic)
+        self.assertIn(2, [len(n.cond.factors) for n, _ in _nodes(tree)])
+
+        ast.set_representation('diagram')
+        diagram = parser.parse('(1 / (x*y)) + (1 / z)')
+        assert isinstance(diagram, ast.Algebraic)
+        self.assertEqual(
+            sorted(str(n.cond) for n, _ in _nodes(diagram)),
+            ['(x)', '(y)', '(z)'],
+        )
+
+    def test_verdicts(self) -> None:
+        exprs = [
+            '(x / x) * x = x',
+            '(x / y) * y = x',
+            '((x / y) + (y / x)) * (x*y) = x*x + y*y',
+            '(1 / (x*y)) * (x*y) = 1',
+        ]
+
+        diagram = [r.verdict for r in prover.prove_many(exprs)]
+        ast.set_representation('tree')
+        tree = [r.verdict for r in prover.prove_many(exprs)]
+
+        self.assertEqual(diagram, tree)
+        self.assertEqual(tree, ['TRUE', 'FALSE', 'FALSE', 'FALSE'])
+
+
+class RestrictTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.x = ast.Polynomial(Symbol('x'))
+        self.y = ast.Polynomial(Symbol('y'))
+
+    def test_condition(self) -> None:
+        f = ast.SMFN(self.x, self.y, ast.Polynomial(1))
+
+        self.assertIs(ast._restrict(f, self.x, True), self.y)
+        self.assertEqual(ast._restrict(f, self.x, False), ast.Polynomial(1))
+        self.assertIs(ast._restrict(f, self.y, True), f)
+
+    def test_zero_leaves(self) -> None:
+        # If x is zero, so are x and x / y.
+        f = ast.SMF0(self.x, self.y)
+
+        self.assertEqual(ast._restrict(f, self.x, False), ast.Polynomial(0))
+        self.assertEqual(
+            ast._restrict(self.x, self.x, False), ast.Polynomial(0)
+        )
+        self.assertIs(ast._restrict(f, self.y, True), f)
+
+    def test_make(self) -> None:
+        # The test of x in the nonzero branch of x is pruned.
+        inner = ast.SMFN(self.x, self.y, ast.Polynomial(1))
+        f = ast.SMFN.make(self.x, inner, ast.Polynomial(0))
+
+        assert isinstance(f, ast.SMFN)
+        self.assertEqual(
+            (f.cond, f.P, f.Q), (self.x, self.y, ast.Polynomial(0))
+        )
+
+        # x**2 is zero iff x is, and then the leaf x is zero too.
+        f = ast.SMFN.make(self.x * self.x, self.y, self.x)
+
+        assert isinstance(f, ast.SMFN)
+        self.assertEqual((f.cond, f.Q), (self.x, ast.Polynomial(0)))
@@ -0,0 +1,72 @@
+# Copyright (c) 2019 Olmo Kramer <olmo.kramer@protonmail.com>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import unittest
+
+from foxi import cache
+
+
+class LRUCacheTest(unittest.TestCase):
+    def test_get(self) -> None:
+        lru: cache.LRUCache[str, int] = cache.LRUCache(2)
+        lru.put('a', 1)
+
+        self.assertEqual(lru.get('a'), 1)
+        self.assertIsNone(lru.get('b'))
+        self.assertEqual(lru.info(), cache.CacheInfo(1, 1, 2, 1))
+
+    def test_evict(self) -> None:
+        lru: cache.LRUCache[str, int] = cache.LRUCache(2)
+        lru.put('a', 1)
+        lru.put('b', 2)
+        lru.get('a')
+        lru.put('c', 3)
+
+        # 'b' is the least recently used entry.
+        self.assertIsNone(lru.get('b'))
+        self.assertEqual(lru.get('a'), 1)
+        self.assertEqual(lru.get('c'), 3)
+
+    def test_unbounded(self) -> None:
+        lru: cache.LRUCache[int, int] = cache.LRUCache(None)
+        for i in range(1000):
+            lru.put(i, i)
+
+        self.assertEqual(len(lru), 1000)
+
+    def test_disabled(self) -> None:
+        lru: cache.LRUCache[str, int] = cache.LRUCache(0)
+        lru.put('a', 1)
+        self.assertIsNone(lru.get('a'))
+
+    def test_resize(self) -> None:
+        lru: cache.LRUCache[int, int] = cache.LRUCache(None)
+        for i in range(10):
+            lru.put(i, i)
+
+        lru.resize(3)
+        self.assertEqual(len(lru), 3)
+        self.assertEqual(lru.get(9), 9)
+
+        lru.resize(0)
+        self.assertEqual(len(lru), 0)
+
+    def test_clear(self) -> None:
+        lru: cache.LRUCache[str, int] = cache.LRUCache()
+        lru.put('a', 1)
+        lru.get('a')
+        lru.clear()
+
+        self.assertEqual(lru.info(), cache.CacheInfo(0, 0, 128, 0))
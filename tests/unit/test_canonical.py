@@ -0,0 +1,79 @@
+# Copyright (c) 2019 Olmo Kramer <olmo.kramer@protonmail.com>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import unittest
+
+from foxi import canonical, parser
+
+
+def _text(expr: str) -> str:
+    canon = canonical.canonicalize(expr)
+    assert canon is not None
+    return canon.text
+
+
+class CanonicalizeTest(unittest.TestCase):
+    def test_renaming(self) -> None:
+        self.assertEqual(
+            _text('(a - b) * c = (c * a) - (c * b)'),
+            _text('(p - q) * r = (r * p) - (r * q)'),
+        )
+
+    def test_commutativity(self) -> None:
+        self.assertEqual(_text('x + (y * z) = 1'), _text('1 = (z * y) + x'))
+
+    def test_distinct(self) -> None:
+        self.assertNotEqual(_text('x / y = 1'), _text('y / x = x'))
+        self.assertNotEqual(_text('x - y = 0'), _text('x + y = 0'))
+
+    def test_flipped(self) -> None:
+        canon = canonical.canonicalize('x = 1')
+        assert canon is not None
+        self.assertEqual(canon.text, '1 = x0')
+        self.assertTrue(canon.flipped)
+
+    def test_not_an_equation(self) -> None:
+        self.assertIsNone(canonical.canonicalize('x + 1'))
+
+    def test_parse_error(self) -> None:
+        with self.assertRaises(parser.ParseError):
+            canonical.canonicalize('x + = 1')
+
+    def test_reparse(self) -> None:
+        # The canonical form is an equation of its own, and canonical.
+        text = _text('(y / x) * (x + 2) = y - (x * x)')
+        self.assertEqual(_text(text), text)
+
+
+class RestoreTest(unittest.TestCase):
+    def test_restore(self) -> None:
+        canon = canonical.canonicalize('b - a = 1')
+        assert canon is not None
+        self.assertEqual(set(canon.names), {'a', 'b'})
+
+        restored = canon.restore(canon.text)
+        self.assertEqual(
+            sorted(restored.split(' = ')), sorted(['1', 'b - a'])
+        )
+
+    def test_rename(self) -> None:
+        canon = canonical.canonicalize('b - a = 1')
+        assert canon is not None
+        self.assertEqual(canon.restore(canon.rename('a * b')), 'a * b')
+
+    def test_unknown_names(self) -> None:
+        canon = canonical.canonicalize('x = y')
+        assert canon is not None
+        self.assertEqual(canon.restore('z * x0'), f'z * {canon.restore("x0")}')
@@ -0,0 +1,92 @@
+# Copyright (c) 2019 Olmo Kramer <olmo.kramer@protonmail.com>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import itertools
+import typing as t
+import unittest
+
+from fractions import Fraction
+
+from foxi import ast, codegen, parser
+
+_EXPRESSIONS = [
+    'x / y',
+    '(x / y) * (y / x)',
+    '((x + 1) / (y - z)) + (z / (x * x))',
+    '1 / ((x / y) + (y / z))',
+    '(1 / 2) - (x / 3)',
+]
+
+_VALUES = [Fraction(0), Fraction(1), Fraction(-2), Fraction(2, 3)]
+
+
+def _points(names: t.Sequence[str]) -> t.Iterator[t.Dict[str, Fraction]]:
+    for values in itertools.product(_VALUES, repeat=len(names)):
+        yield dict(zip(names, values))
+
+
+class CompileTreeTest(unittest.TestCase):
+    def test_meadow(self) -> None:
+        evaluate = codegen.compile_tree(parser.syntax_tree('x / y'))
+
+        self.assertEqual(evaluate({'x': Fraction(1), 'y': Fraction(0)}), 0)
+        self.assertEqual(
+            evaluate({'x': Fraction(1), 'y': Fraction(2)}), Fraction(1, 2)
+        )
+
+    def test_exact(self) -> None:
+        evaluate = codegen.compile_tree(parser.syntax_tree('1 / 3'))
+        self.assertEqual(evaluate({}), Fraction(1, 3))
+
+    def test_equation(self) -> None:
+        evaluate = codegen.compile_tree(parser.syntax_tree('x * 2 = x + 1'))
+        self.assertEqual(evaluate({'x': Fraction(3)}), (6, 4))
+
+    def test_deep(self) -> None:
+        text = '1'
+        for _ in range(500):
+            text = f'(x + {text})'
+
+        evaluate = codegen.compile_tree(parser.syntax_tree(text))
+        self.assertEqual(evaluate({'x': Fraction(1)}), 501)
+
+
+class CompileFunctionTest(unittest.TestCase):
+    def tearDown(self) -> None:
+        ast.set_backend('sympy')
+        ast.set_representation('tree')
+
+    def check(self) -> None:
+        for text in _EXPRESSIONS:
+            expected = codegen.compile_tree(parser.syntax_tree(text))
+            expr = parser.parse(text)
+            assert isinstance(expr, ast.Algebraic)
+
+            names = sorted(str(v) for v in expr.free_variables)
+            for point in _points(names):
+                self.assertEqual(
+                    expr.compiled(point), expected(point), (text, point)
+                )
+
+    def test_sympy(self) -> None:
+        self.check()
+
+    def test_sparse(self) -> None:
+        ast.set_backend('sparse')
+        self.check()
+
+    def test_diagram(self) -> None:
+        ast.set_representation('diagram')
+        self.check()
@@ -0,0 +1,39 @@
+# Copyright (c) 2019 Olmo Kramer <olmo.kramer@protonmail.com>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import unittest
+
+from foxi import generate, parser, refute
+
+
+class GenerateTest(unittest.TestCase):
+    def test_verdicts(self) -> None:
+        # The verdicts are certified without the prover: every FALSE
+        # equation has a counterexample, and no TRUE equation has one.
+        for verdict, text in generate.generate(50, seed=0):
+            refutation = refute.refute(parser.syntax_tree(text), 256, text)
+            self.assertEqual(refutation is None, verdict == 'TRUE', text)
+
+    def test_unverified(self) -> None:
+        equations = list(generate.generate(5, verdict='FALSE', verify=False))
+        for verdict, text in equations:
+            self.assertEqual(verdict, 'FALSE')
+            self.assertRegex(text, r' \+ [123]$')
+
+    def test_seed(self) -> None:
+        self.assertEqual(
+            list(generate.generate(5, seed=1)),
+            list(generate.generate(5, seed=1)),
+        )
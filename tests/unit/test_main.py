@@ -0,0 +1,140 @@
+# Copyright (c) 2019 Olmo Kramer <olmo.kramer@protonmail.com>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import contextlib
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import typing as t
+import unittest
+
+from foxi import __main__ as main
+from foxi import worker
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
+
+
+def _slow(expr: str) -> str:
+    # Later expressions finish first.
+    time.sleep(0.02 * (10 - int(expr)))
+    print(f'out {expr}')
+    return f'result {expr}'
+
+
+def _fail(expr: str) -> str:
+    if expr == '1':
+        raise ValueError(expr)
+    return expr
+
+
+class MapExprsTest(unittest.TestCase):
+    exprs = [str(i) for i in range(10)]
+
+    def check(
+        self, results: t.List[t.Tuple[str, t.Any, str]], printed: bool
+    ) -> None:
+        self.assertEqual(
+            [(expr, res) for expr, res, _ in results],
+            [(expr, f'result {expr}') for expr in self.exprs],
+        )
+
+        self.assertEqual(
+            [out for _, _, out in results],
+            [f'out {expr}\n' if printed else '' for expr in self.exprs],
+        )
+
+    def test_serial(self) -> None:
+        # The output of serial calls is printed directly.
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            results = list(main._map_exprs(_slow, iter(self.exprs), 1))
+
+        self.check(results, printed=False)
+        self.assertEqual(
+            out.getvalue(), ''.join(f'out {expr}\n' for expr in self.exprs)
+        )
+
+    def test_jobs(self) -> None:
+        results = list(main._map_exprs(_slow, iter(self.exprs), 2))
+        self.check(results, printed=True)
+
+    def test_timeout(self) -> None:
+        results = list(main._map_exprs(_slow, iter(self.exprs), 2, 10))
+        self.check(results, printed=True)
+
+    def test_error(self) -> None:
+        results = list(main._map_exprs(_fail, iter(['0', '1', '2']), 2, 10))
+
+        self.assertEqual([expr for expr, _, _ in results], ['0', '1', '2'])
+        self.assertIsInstance(results[1][1], worker.WorkerError)
+        self.assertEqual([results[0][1], results[2][1]], ['0', '2'])
+
+
+class JsonlTest(unittest.TestCase):
+    def run_foxi(
+        self, *args: str, input: str, failures: int = 0
+    ) -> t.List[t.Dict[str, t.Any]]:
+        with tempfile.NamedTemporaryFile('w', suffix='.txt') as f:
+            f.write(input)
+            f.flush()
+
+            process = subprocess.run(
+                [sys.executable, '-m', 'foxi', '-f', 'jsonl', *args, f.name],
+                cwd=_ROOT or '.',
+                stdout=subprocess.PIPE,
+                universal_newlines=True,
+            )
+
+        # The exit status of a test run is its number of failures.
+        self.assertEqual(process.returncode, failures)
+        return [json.loads(line) for line in process.stdout.splitlines()]
+
+    def test_records(self) -> None:
+        records = self.run_foxi(
+            input='x / x * x = x\n# comment\nx y = 1\n(x / y) * y = x\n'
+        )
+
+        self.assertEqual(
+            [(r['expression'], r['verdict']) for r in records],
+            [
+                ('x / x * x = x', 'TRUE'),
+                ('x y = 1', 'ERROR'),
+                ('(x / y) * y = x', 'FALSE'),
+            ],
+        )
+        self.assertEqual(records[1]['error'], 'Missing operator')
+        self.assertEqual(records[2]['residual'], '(x)')
+        self.assertEqual(records[2]['counterexample'], {'y': 'zero'})
+
+    def test_test(self) -> None:
+        records = self.run_foxi(
+            '--test',
+            '--stats',
+            input='TRUE x / x * x = x\nTRUE x = 1\n',
+            failures=1,
+        )
+
+        self.assertEqual(
+            [(r['expected'], r['success']) for r in records[:2]],
+            [('TRUE', True), ('TRUE', False)],
+        )
+
+        # The stats of the whole run come last.
+        self.assertEqual(list(records[2]), ['stats'])
+        self.assertEqual(set(records[2]['stats']), {'counters', 'timers'})
@@ -0,0 +1,148 @@
+# Copyright (c) 2019 Olmo Kramer <olmo.kramer@protonmail.com>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import unittest
+
+from foxi import ast, parser, prover
+from foxi.sympy_types import Rational, Symbol
+
+
+class LexTest(unittest.TestCase):
+    def test_tokens(self) -> None:
+        operators = parser._OPERATORS
+        self.assertEqual(
+            list(parser._lex('x1+ 2*(y_b -3)')),
+            [
+                Symbol('x1'),
+                operators['+'],
+                Rational(2),
+                operators['*'],
+                parser._Paren.LEFT,
+                Symbol('y_b'),
+                operators['-'],
+                Rational(3),
+                parser._Paren.RIGHT,
+            ],
+        )
+
+    def test_shared(self) -> None:
+        first, _, second = parser._lex('x + x')
+        self.assertIs(first, second)
+
+    def test_decimals(self) -> None:
+        # Decimals are exact rationals, not floats.
+        self.assertEqual(
+            parser.syntax_tree('0.1 + 0.2 = 0.3'),
+            ('=', ('+', Rational(1, 10), Rational(1, 5)), Rational(3, 10)),
+        )
+        self.assertEqual(parser.syntax_tree('3.'), Rational(3))
+        self.assertEqual(prover.prove('0.1 + 0.2 = 0.3').verdict, 'TRUE')
+
+    def test_unexpected_character(self) -> None:
+        with self.assertRaisesRegex(
+            parser.ParseError, 'Unexpected character: %'
+        ):
+            parser.syntax_tree('x %  2 = 1')
+
+
+class SyntaxTreeTest(unittest.TestCase):
+    def test_tree(self) -> None:
+        x = Symbol('x')
+        self.assertEqual(
+            parser.syntax_tree('x / 2 = x - 1'),
+            ('=', ('/', x, Rational(2)), ('-', x, Rational(1))),
+        )
+
+    def test_from_syntax_tree(self) -> None:
+        text = '(x / y) * (y + 1)'
+        self.assertIs(
+            parser.from_syntax_tree(parser.syntax_tree(text)),
+            parser._parse(text),
+        )
+
+        # Equations are not interned, but their sides are.
+        equation = parser.from_syntax_tree(parser.syntax_tree('x / 2 = 1'))
+        assert isinstance(equation, ast.Equation)
+        self.assertIs(equation.lhs, parser._parse('x / 2'))
+
+
+class ParseCacheTest(unittest.TestCase):
+    def setUp(self) -> None:
+        parser.clear_parse_cache()
+
+    def tearDown(self) -> None:
+        ast.set_backend('sympy')
+        ast.set_representation('tree')
+
+    def test_whitespace(self) -> None:
+        first = parser.parse('x / y = 1')
+        self.assertIs(parser.parse(' x  /\ty = 1 '), first)
+        self.assertEqual(parser.parse_cache_info().hits, 1)
+
+    def test_backend(self) -> None:
+        sympy_expr = parser.parse('x + 1')
+        ast.set_backend('sparse')
+        sparse_expr = parser.parse('x + 1')
+
+        self.assertIsNot(sparse_expr, sympy_expr)
+        self.assertEqual(parser.parse_cache_info().hits, 0)
+
+    def test_representation(self) -> None:
+        parser.parse('(x / y) * (y / x)')
+        ast.set_representation('diagram')
+        parser.parse('(x / y) * (y / x)')
+
+        self.assertEqual(parser.parse_cache_info().hits, 0)
+
+    def test_immutable(self) -> None:
+        # The cached trees are shared by all callers, so they can't change.
+        expr = parser.parse('x / y')
+        with self.assertRaises(AttributeError):
+            expr.rhs = parser.parse('1')  # type: ignore
+        self.assertIs(parser.parse('x / y'), expr)
+
+
+class ParseErrorTest(unittest.TestCase):
+    def check(self, expr: str, message: str) -> None:
+        with self.assertRaisesRegex(parser.ParseError, message):
+            parser.syntax_tree(expr)
+
+        with self.assertRaisesRegex(parser.ParseError, message):
+            parser.parse(expr)
+
+        result = prover.prove(expr)
+        self.assertEqual(result.verdict, 'ERROR')
+        self.assertRegex(result.error, message)
+
+    def test_missing_operator(self) -> None:
+        self.check('x y = 1', 'Missing operator')
+
+    def test_empty(self) -> None:
+        self.check('', 'Empty expression')
+        self.check('  ', 'Empty expression')
+
+    def test_nested_equation(self) -> None:
+        self.check('x = y = z', 'Unexpected =')
+        self.check('(x = y) + 1', 'Unexpected =')
+        self.check('x * (y = z)', 'Unexpected =')
+
+    def test_parentheses(self) -> None:
+        self.check('(x + 1 = 2', 'Unbalanced parentheses')
+        self.check('x + 1) = 2', 'Unbalanced parentheses')
+
+    def test_prove_many(self) -> None:
+        # A bad expression doesn't stop the others.
+        results = prover.prove_many(['x y = 1', 'x = x'])
+        self.assertEqual([r.verdict for r in results], ['ERROR', 'TRUE'])
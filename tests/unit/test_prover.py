@@ -0,0 +1,56 @@
+# Copyright (c) 2019 Olmo Kramer <olmo.kramer@protonmail.com>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import unittest
+
+from foxi import ast, prover
+
+
+class ProveManyTest(unittest.TestCase):
+    def test_order(self) -> None:
+        exprs = ['x / x = 1', '(x / x) * x = x', 'y * z = z * y']
+        results = list(prover.prove_many(exprs))
+
+        self.assertEqual([r.expression for r in results], exprs)
+        self.assertEqual(
+            [r.verdict for r in results], ['FALSE', 'TRUE', 'TRUE']
+        )
+
+    def test_memo_scope(self) -> None:
+        # The memo table of an equation is gone before its result arrives.
+        for _ in prover.prove_many(['x / x = 1', '(x / x) * x = x']):
+            self.assertIsNone(ast._eval_memo)
+
+    def test_original_proven(self) -> None:
+        # The prover doesn't prove all rewrites of this TRUE equation, so
+        # its canonical form must not be proven in its place.
+        expr = (
+            '((z - x) / z) / (z / (z / x)) = 1 / (1 / (((z - x) / z) / ((z'
+            ' / (z / x)) + ((x - (1 / (1 / y))) + (0 - (x + (0 - y)))))))'
+        )
+
+        self.assertEqual(prover.prove(expr).verdict, 'TRUE')
+        self.assertEqual(
+            [r.verdict for r in prover.prove_many([expr])], ['TRUE']
+        )
+
+    def test_shared_proof(self) -> None:
+        first, second = prover.prove_many(['a / b = 1', 'b / c = 1'])
+
+        self.assertFalse(first.cached)
+        self.assertTrue(second.cached)
+        # Only the variable in the condition has a value.
+        self.assertEqual(first.counterexample, {'b': 'zero'})
+        self.assertEqual(second.counterexample, {'c': 'zero'})
@@ -0,0 +1,96 @@
+# Copyright (c) 2019 Olmo Kramer <olmo.kramer@protonmail.com>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import typing as t
+import unittest
+import unittest.mock
+
+from fractions import Fraction
+
+from foxi import parser, prover, refute
+from foxi.sympy_types import Symbol
+
+
+def _evaluate(tree: parser.SyntaxTree, point: t.Dict[str, int]) -> Fraction:
+    if isinstance(tree, Symbol):
+        return Fraction(point[str(tree)])
+
+    if not isinstance(tree, tuple):
+        return Fraction(int(tree.p), int(tree.q))
+
+    op, x, y = tree
+    x, y = _evaluate(x, point), _evaluate(y, point)
+
+    if op == '/':
+        return x / y if y else Fraction(0)
+
+    return {'+': x + y, '-': x - y, '*': x * y}[op]
+
+
+def _refute(expr: str, points: int = 64) -> refute.Refutation:
+    return refute.refute(parser.syntax_tree(expr), points, seed=expr)
+
+
+class RefuteTest(unittest.TestCase):
+    def check(self, expr: str) -> None:
+        refutation = _refute(expr)
+        self.assertIsNotNone(refutation)
+
+        # The counterexample is certified by exact arithmetic.
+        _, lhs, rhs = parser.syntax_tree(expr)
+        self.assertEqual(refutation.lhs, _evaluate(lhs, refutation.point))
+        self.assertEqual(refutation.rhs, _evaluate(rhs, refutation.point))
+        self.assertNotEqual(refutation.lhs, refutation.rhs)
+
+    def test_false(self) -> None:
+        self.check('x + y = x * y')
+        self.check('(x * x) / x = x + 1')
+
+    def test_division_by_zero(self) -> None:
+        # Only false where x is 0.
+        self.check('x / x = 1')
+        self.assertEqual(_refute('x / x = 1').point, {'x': 0})
+
+    def test_true(self) -> None:
+        self.assertIsNone(_refute('(x + y) * (x - y) = (x * x) - (y * y)'))
+        self.assertIsNone(_refute('(x / x) * x = x'))
+        self.assertIsNone(_refute('1 / (1 / x) = x'))
+
+    def test_no_points(self) -> None:
+        self.assertIsNone(_refute('x = 1', 0))
+
+    def test_deterministic(self) -> None:
+        self.assertEqual(_refute('x + y = 1'), _refute('x + y = 1'))
+
+    def test_exact(self) -> None:
+        with unittest.mock.patch.object(refute, 'numpy', None):
+            self.check('x / (y + 1) = x')
+            self.assertIsNone(_refute('(x / x) * x = x'))
+
+
+class ProveTest(unittest.TestCase):
+    def setUp(self) -> None:
+        refute.set_points(32)
+
+    def tearDown(self) -> None:
+        refute.set_points(0)
+
+    def test_refuted(self) -> None:
+        result = prover.prove('x / x = 1')
+        self.assertEqual(result.verdict, 'FALSE')
+        self.assertEqual(result.counterexample, {'x': '0'})
+
+    def test_proven(self) -> None:
+        self.assertEqual(prover.prove('(x / x) * x = x').verdict, 'TRUE')
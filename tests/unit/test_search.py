@@ -0,0 +1,129 @@
+# Copyright (c) 2019 Olmo Kramer <olmo.kramer@protonmail.com>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import random
+import typing as t
+import unittest
+
+from foxi import ast, generate, parser, search, stats
+from foxi.sympy_types import Symbol
+
+
+def _difference(expr: str) -> t.Tuple[ast.Algebraic, t.List[Symbol]]:
+    equation = parser.parse(expr)
+    assert isinstance(equation, ast.Equation)
+
+    diff = equation.lhs - equation.rhs
+    return diff, sorted(diff.condition_variables, key=str)
+
+
+def _search(expr: str) -> t.Optional[int]:
+    diff, variables = _difference(expr)
+    failure = search.search(diff, variables, frozenset(), frozenset())
+    return None if failure is None else failure[0]
+
+
+def _enumerate(expr: str) -> t.Optional[int]:
+    """Find the first counterexample by evaluating every assignment.
+    """
+
+    diff, variables = _difference(expr)
+
+    for i in range(1 << len(variables)):
+        zeros, nonzeros = search.assignment(variables, i)
+        if search._is_counterexample(diff.eval(zeros, nonzeros)):
+            return i
+
+    return None
+
+
+_EQUATIONS = [
+    'x / x = 1',
+    'a / a = b / b',
+    '(a * (b * (c * d))) / (a * (b * (c * d))) = 0',
+    '(x / y) * y = x',
+    '((x / y) + (z / y)) * y = x + z',
+] + [text for _, text in generate.generate(20, seed=3)]
+
+
+class AssignTest(unittest.TestCase):
+    def test_assign(self) -> None:
+        # Assigning the variables one at a time and evaluating the rest
+        # agrees with evaluating the assignment at once.
+        rng = random.Random(0)
+
+        for expr in _EQUATIONS:
+            diff, variables = _difference(expr)
+
+            for _ in range(8):
+                i = rng.randrange(1 << len(variables))
+                zeros, nonzeros = search.assignment(variables, i)
+
+                assigned = diff
+                for v in rng.sample(variables, len(variables)):
+                    assigned = assigned.assign(v, v in nonzeros)
+
+                self.assertEqual(
+                    search._is_counterexample(assigned.eval(zeros, nonzeros)),
+                    search._is_counterexample(diff.eval(zeros, nonzeros)),
+                    (expr, i),
+                )
+
+    def test_unassigned(self) -> None:
+        diff, _ = _difference('x / x = 1')
+        self.assertIs(diff.assign(Symbol('y'), True), diff)
+
+
+class SearchTest(unittest.TestCase):
+    def tearDown(self) -> None:
+        search.set_jobs(1)
+        stats.set_enabled(False)
+
+    def test_first_counterexample(self) -> None:
+        for expr in _EQUATIONS:
+            self.assertEqual(_search(expr), _enumerate(expr), expr)
+
+    def test_known(self) -> None:
+        self.assertEqual(_search('x / x = 1'), 0)
+        # Fails only if exactly one of the variables is zero.
+        self.assertEqual(_search('a / a = b / b'), 1)
+        # Fails only if all variables are nonzero.
+        self.assertEqual(
+            _search('(a * (b * (c * d))) / (a * (b * (c * d))) = 0'), 15
+        )
+        self.assertIsNone(_search('(x / y) * y = x * (y / y)'))
+
+    def test_parallel(self) -> None:
+        sequential = [_search(expr) for expr in _EQUATIONS]
+
+        search.set_jobs(4)
+        parallel = [_search(expr) for expr in _EQUATIONS]
+
+        self.assertEqual(parallel, sequential)
+
+    def test_cancel(self) -> None:
+        # Every assignment is a counterexample. The ranges after the first
+        # are cancelled, or stop before checking an assignment.
+        names = 'abcdefgh'
+        expr = ' + '.join(f'({v} / {v})' for v in names) + ' = 8'
+
+        stats.set_enabled(True)
+        search.set_jobs(4)
+
+        with stats.collect() as collected:
+            self.assertEqual(_search(expr), 0)
+
+        counters = collected.as_dict()['counters']
+        self.assertLess(counters['assignments'], 1 << len(names))
@@ -0,0 +1,143 @@
+# Copyright (c) 2019 Olmo Kramer <olmo.kramer@protonmail.com>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import typing as t
+import unittest
+
+from foxi import server
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
+
+
+class _ServerTest(unittest.TestCase):
+    args: t.Sequence[str] = ()
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.dir = tempfile.TemporaryDirectory()
+        cls.address = os.path.join(cls.dir.name, 'foxi.sock')
+        cls.process = subprocess.Popen(
+            [sys.executable, '-m', 'foxi', '--serve', cls.address]
+            + list(cls.args),
+            cwd=_ROOT or '.',
+            stdout=subprocess.DEVNULL,
+        )
+
+        deadline = time.monotonic() + 60
+        while not os.path.exists(cls.address):
+            if time.monotonic() > deadline or cls.process.poll() is not None:
+                raise RuntimeError('The server did not start')
+            time.sleep(0.05)
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls.process.terminate()
+        cls.process.wait()
+        cls.dir.cleanup()
+
+    def connect(self) -> server.Client:
+        return server.Client(self.address)
+
+
+class ServerTest(_ServerTest):
+    args = ('-j', '2')
+
+    def test_prove(self) -> None:
+        with self.connect() as client:
+            result = client.prove('x / x = 1')
+
+        self.assertEqual(result.verdict, 'FALSE')
+
+    def test_order(self) -> None:
+        # More requests than are allowed in flight at once.
+        exprs = [f'x + {i} = {i} + x' for i in range(20)] + ['x = 1']
+
+        with self.connect() as client:
+            results = list(client.prove_many(exprs, output=False))
+
+        self.assertEqual([r.expression for r, _ in results], exprs)
+        self.assertEqual(
+            [r.verdict for r, _ in results], ['TRUE'] * 20 + ['FALSE']
+        )
+
+    def test_invalid(self) -> None:
+        with socket.socket(socket.AF_UNIX) as sock:
+            sock.connect(self.address)
+            sock.sendall(b'{"timeout": 1}\nx = x\n')
+            sock.shutdown(socket.SHUT_WR)
+
+            with sock.makefile('rb') as f:
+                answers = f.read().splitlines()
+
+        self.assertEqual(len(answers), 2)
+        self.assertIn(b'"ERROR"', answers[0])
+        self.assertIn(b'"TRUE"', answers[1])
+
+
+    def test_invalid_timeout(self) -> None:
+        with socket.socket(socket.AF_UNIX) as sock:
+            sock.connect(self.address)
+            sock.sendall(
+                b'{"expression": "x / x = 1", "timeout": "5"}\n'
+                b'{"expression": "b = 0", "timeout": "soon"}\n'
+                b'{"expression": "b = 0", "timeout": -1}\n'
+                b'a = a\n'
+            )
+            sock.shutdown(socket.SHUT_WR)
+
+            with sock.makefile('rb') as f:
+                answers = f.read().splitlines()
+
+        self.assertEqual(len(answers), 4)
+        self.assertIn(b'"FALSE"', answers[0])
+        self.assertIn(b'"ERROR"', answers[1])
+        self.assertIn(b'"ERROR"', answers[2])
+        self.assertIn(b'"TRUE"', answers[3])
+
+        # The workers are still in a good state for the next client.
+        with self.connect() as client:
+            self.assertEqual(client.prove('a = a').verdict, 'TRUE')
+
+
+class TimeoutTest(_ServerTest):
+    args = ('--timeout', '0.001')
+
+    def test_timeout(self) -> None:
+        with self.connect() as client:
+            self.assertEqual(client.prove('x = x').verdict, 'TIMEOUT')
+
+    def test_client_without_timeout(self) -> None:
+        # The timeouts of the server are reported as such, even though the
+        # client has no timeout of its own.
+        path = os.path.join(self.dir.name, 'test')
+        with open(path, 'w') as f:
+            f.write('TRUE x = x\n')
+
+        process = subprocess.run(
+            [sys.executable, '-m', 'foxi', '--test']
+            + ['--connect', self.address, path],
+            cwd=_ROOT or '.',
+            stdout=subprocess.PIPE,
+            universal_newlines=True,
+        )
+
+        self.assertIn('1 / 1 tests timed out', process.stdout)
+        self.assertNotIn('fail', process.stdout)
@@ -0,0 +1,83 @@
+# Copyright (c) 2019 Olmo Kramer <olmo.kramer@protonmail.com>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import unittest
+
+from fractions import Fraction
+
+from sympy import expand, sympify
+
+from foxi import sparse
+
+
+def _poly(text: str) -> sparse.SparsePoly:
+    return sparse.convert(text)
+
+
+class SparsePolyTest(unittest.TestCase):
+    def test_arithmetic(self) -> None:
+        x = sparse.SparsePoly.variable('x')
+        y = sparse.SparsePoly.variable('y')
+
+        self.assertEqual((x + y) * (x + -y), _poly('x**2 - y**2'))
+        self.assertTrue((x + -x).is_zero)
+        self.assertEqual((x + _poly('1')) / _poly('2'), _poly('x/2 + 1/2'))
+
+    def test_sympy(self) -> None:
+        text = '(x - 2*y) * (x + z/3) + 1'
+        poly = _poly(text)
+        self.assertEqual(expand(poly.as_expr() - sympify(text)), 0)
+
+    def test_numbers(self) -> None:
+        half = sparse.SparsePoly.constant(Fraction(1, 2))
+
+        self.assertTrue(half.is_number)
+        self.assertEqual(half, Fraction(1, 2))
+        self.assertEqual(hash(half), hash(Fraction(1, 2)))
+        self.assertEqual(sparse.SparsePoly.constant(0), 0)
+
+    def test_division_by_polynomial(self) -> None:
+        with self.assertRaises(ZeroDivisionError):
+            _poly('x') / _poly('x')
+
+        with self.assertRaises(ZeroDivisionError):
+            _poly('x') / _poly('0')
+
+    def test_free_symbols(self) -> None:
+        self.assertEqual(
+            _poly('x*y + 1').free_symbols, {_poly('x'), _poly('y')}
+        )
+        self.assertEqual(_poly('x').variable_name, 'x')
+        self.assertIsNone(_poly('2*x').variable_name)
+
+    def test_subs(self) -> None:
+        poly = _poly('x*y + x + z + 1')
+
+        self.assertEqual(poly.subs({_poly('x'): 0}), _poly('z + 1'))
+        self.assertEqual(poly.subs({poly: 0}), 0)
+        self.assertEqual(
+            _poly('x*y + z').subs({_poly('x*y'): 0}), _poly('z')
+        )
+
+    def test_primitive(self) -> None:
+        self.assertEqual(_poly('x/2 + 1').primitive(), _poly('x + 2'))
+        self.assertEqual(_poly('-2*x - 4').primitive(), _poly('x + 2'))
+
+    def test_factor_list(self) -> None:
+        factors = _poly('2*x**2*y - 2*y').factor_list()
+        self.assertEqual(
+            set(factors), {_poly('y'), _poly('1 - x'), _poly('x + 1')}
+        )
+        self.assertEqual(_poly('3').factor_list(), (_poly('3'),))
@@ -0,0 +1,92 @@
+# Copyright (c) 2019 Olmo Kramer <olmo.kramer@protonmail.com>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import unittest
+
+import foxi
+from foxi import stats
+
+
+class StatsTest(unittest.TestCase):
+    def test_count(self) -> None:
+        s = stats.Stats()
+        s.count('a')
+        s.count('a', 2)
+        s.count('b')
+
+        self.assertEqual(s.as_dict()['counters'], {'a': 3, 'b': 1})
+
+    def test_nested_timer(self) -> None:
+        s = stats.Stats()
+        with s.timer('a'):
+            with s.timer('a'):
+                pass
+
+        self.assertEqual(list(s.timers), ['a'])
+        self.assertGreaterEqual(s.timers['a'], 0)
+
+    def test_merge(self) -> None:
+        s = stats.Stats()
+        s.count('a')
+        s.timers['t'] = 1.0
+
+        other = stats.Stats()
+        other.count('a', 2)
+        other.timers['t'] = 0.5
+
+        s.merge(other)
+        s.merge({'counters': {'b': 1}, 'timers': {'t': 0.5}})
+
+        self.assertEqual(
+            s.as_dict(), {'counters': {'a': 3, 'b': 1}, 'timers': {'t': 2.0}}
+        )
+
+
+class CollectTest(unittest.TestCase):
+    def setUp(self) -> None:
+        stats.reset()
+
+    def tearDown(self) -> None:
+        stats.set_enabled(False)
+        stats.reset()
+
+    def test_scopes(self) -> None:
+        with stats.collect() as outer:
+            stats.count('a')
+            with stats.collect() as inner:
+                stats.count('a')
+                stats.count('b')
+
+            self.assertIs(stats.current(), outer)
+
+        self.assertEqual(inner.counters, {'a': 1, 'b': 1})
+        self.assertEqual(outer.counters, {'a': 2, 'b': 1})
+        self.assertEqual(stats.total().counters, {'a': 2, 'b': 1})
+
+    def test_disabled(self) -> None:
+        with stats.collect() as s:
+            foxi.prove('x / x * x = x')
+
+        self.assertFalse(s.counters)
+        self.assertFalse(s.timers)
+
+    def test_enabled(self) -> None:
+        stats.set_enabled(True)
+        with stats.collect() as s:
+            foxi.prove('x / x * x = x')
+
+        self.assertTrue(s.counters)
+        self.assertTrue(s.timers)
+        self.assertTrue(s.summary())
@@ -0,0 +1,84 @@
+# Copyright (c) 2019 Olmo Kramer <olmo.kramer@protonmail.com>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import pickle
+import tempfile
+import unittest
+import unittest.mock
+
+from foxi import store
+
+
+class ProofCacheTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.dir = tempfile.TemporaryDirectory()
+        self.cache = store.ProofCache.in_dir(self.dir.name)
+
+    def tearDown(self) -> None:
+        self.dir.cleanup()
+
+    def test_missing(self) -> None:
+        self.assertIsNone(self.cache.get('x = x'))
+
+    def test_round_trip(self) -> None:
+        self.cache.put('x = x', 'TRUE')
+        self.cache.put('x = 1', 'FALSE', 'x - 1', {'x': '0'})
+
+        self.assertEqual(
+            self.cache.get('x = x'), store.Entry('TRUE', None, None)
+        )
+        self.assertEqual(
+            self.cache.get('x = 1'), store.Entry('FALSE', 'x - 1', {'x': '0'})
+        )
+
+    def test_empty_counterexample(self) -> None:
+        # Equations without variables are refuted by the empty assignment.
+        self.cache.put('0 = 1', 'FALSE', '-1', {})
+        self.assertEqual(
+            self.cache.get('0 = 1'), store.Entry('FALSE', '-1', {})
+        )
+
+    def test_whitespace(self) -> None:
+        self.cache.put('x  =\tx', 'TRUE')
+        self.assertEqual(
+            self.cache.get(' x = x '), store.Entry('TRUE', None, None)
+        )
+
+    def test_versions(self) -> None:
+        self.cache.put('x = x', 'TRUE')
+        other = store.ProofCache(self.cache.path, version='0.0.0')
+
+        self.assertIsNone(other.get('x = x'))
+        self.assertEqual(other.prune(), 1)
+        self.assertEqual(len(self.cache), 0)
+
+    def test_results_versions(self) -> None:
+        # The results of the same foxi version can change too.
+        self.cache.put('x = x', 'TRUE')
+        with unittest.mock.patch.object(store, '_RESULTS_VERSION', 0):
+            other = store.ProofCache(self.cache.path)
+
+        self.assertIsNone(other.get('x = x'))
+        self.assertEqual(other.prune(), 1)
+
+    def test_invalidate(self) -> None:
+        self.cache.put('x = x', 'TRUE')
+        self.cache.invalidate('x = x')
+        self.assertIsNone(self.cache.get('x = x'))
+
+    def test_pickle(self) -> None:
+        self.cache.put('x = x', 'TRUE')
+        copy = pickle.loads(pickle.dumps(self.cache))
+        self.assertEqual(copy.get('x = x'), store.Entry('TRUE', None, None))
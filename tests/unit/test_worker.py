@@ -0,0 +1,112 @@
+# Copyright (c) 2019 Olmo Kramer <olmo.kramer@protonmail.com>
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import time
+import unittest
+
+from foxi import worker
+
+
+def _sleep(seconds: float) -> float:
+    time.sleep(seconds)
+    return seconds
+
+
+def _fail(x: int) -> int:
+    if x == 1:
+        raise ValueError('one')
+    if x == 2:
+        os._exit(1)
+    return x
+
+
+_offset = 0
+
+
+def _set_offset(offset: int) -> None:
+    global _offset
+    _offset = offset
+
+
+def _add_offset(x: int) -> int:
+    return x + _offset
+
+
+class WorkerTest(unittest.TestCase):
+    def test_submit(self) -> None:
+        w = worker.Worker(_add_offset, _set_offset, (10,))
+
+        try:
+            w.submit(1)
+            self.assertEqual(w.result(), 11)
+        finally:
+            w.kill()
+
+    def test_error(self) -> None:
+        w = worker.Worker(_fail)
+
+        try:
+            w.submit(1)
+            with self.assertRaises(worker.WorkerError):
+                w.result()
+
+            w.submit(3)
+            self.assertEqual(w.result(), 3)
+        finally:
+            w.kill()
+
+    def test_restart(self) -> None:
+        w = worker.Worker(_sleep)
+
+        try:
+            w.submit(60)
+            self.assertFalse(w.conn.poll(0.1))
+            w.restart()
+
+            w.submit(0)
+            self.assertEqual(w.result(), 0)
+        finally:
+            w.kill()
+
+
+class MapWithTimeoutTest(unittest.TestCase):
+    def test_order(self) -> None:
+        items = [0.2, 0.0, 0.1, 0.0]
+        results = list(worker.map_with_timeout(_sleep, items, 2, 10))
+        self.assertEqual(results, [(x, x) for x in items])
+
+    def test_timeout(self) -> None:
+        start = time.monotonic()
+        results = list(worker.map_with_timeout(_sleep, [60, 0], 2, 0.5))
+
+        self.assertEqual(results, [(60, None), (0, 0)])
+        self.assertLess(time.monotonic() - start, 30)
+
+    def test_errors(self) -> None:
+        results = dict(worker.map_with_timeout(_fail, range(4), 1, 10))
+
+        self.assertEqual(results[0], 0)
+        self.assertIsInstance(results[1], worker.WorkerError)
+        self.assertIn('one', str(results[1]))
+        # The worker died, and is replaced for the next item.
+        self.assertIsInstance(results[2], worker.WorkerError)
+        self.assertEqual(results[3], 3)
+
+    def test_initializer(self) -> None:
+        results = worker.map_with_timeout(
+            _add_offset, range(3), 1, 10, _set_offset, (10,)
+        )
+        self.assertEqual([r for _, r in results], [10, 11, 12])